@@ -0,0 +1,270 @@
+"""
+转换基准测试
+生成固定随机种子的合成图片集，测试各输入→输出格式组合、缩略图生成和冲突扫描的耗时，
+输出吞吐量（张/秒、百万像素/秒）和峰值内存，结果写入JSON便于对比两次运行
+
+用法:
+    python -m benchmarks.bench_conversion [-o results.json] [--sizes 1,4,12] [--formats JPEG,PNG]
+    python -m benchmarks.bench_conversion --compare old.json new.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from core.utils import peak_rss_bytes
+
+SEED = 20240601
+
+# 合成图片集的输入格式: 名称 -> (扩展名, 位深)
+CORPUS_FORMATS = {
+    'png8': ('.png', 8),
+    'png16': ('.png', 16),
+    'tiff8': ('.tif', 8),
+    'tiff16': ('.tif', 16),
+    'jpeg': ('.jpg', 8),
+    'webp': ('.webp', 8),
+    'heic': ('.heic', 8),
+    'avif': ('.avif', 8),
+    'dng': ('.dng', 16),
+}
+
+
+def make_pixels(megapixels, bit_depth, seed):
+    """
+    生成固定内容的RGB图像：平滑渐变叠加噪声，压缩难度接近真实照片
+
+    Returns:
+        numpy.ndarray: (高, 宽, 3) 的uint8或uint16数组
+    """
+    width = int((megapixels * 1e6 * 4 / 3) ** 0.5)
+    height = int(width * 3 / 4)
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    base = np.stack([x / width, y / height, (x + y) / (width + height)], axis=-1)
+    pixels = base * 0.8 + rng.random((height, width, 3), dtype=np.float32) * 0.2
+    max_value = 65535 if bit_depth == 16 else 255
+    return (pixels * max_value).astype(np.uint16 if bit_depth == 16 else np.uint8)
+
+
+def write_corpus_file(path, name, pixels):
+    """
+    按格式写入单个合成图片
+
+    Returns:
+        bool: 是否写入成功（依赖缺失时跳过）
+    """
+    import cv2 as cv
+    from PIL import Image
+    ext, bit_depth = CORPUS_FORMATS[name]
+    if name == 'dng':
+        try:
+            from pidng.core import RAW2DNG, DNGTags, Tag
+            from pidng.defs import PhotometricInterpretation
+        except ImportError:
+            return False
+        # 用绿色通道生成RGGB拜耳阵列
+        height, width = pixels.shape[:2]
+        bayer = (pixels[:, :, 1] >> 4).astype(np.uint16)
+        tags = DNGTags()
+        tags.set(Tag.ImageWidth, width)
+        tags.set(Tag.ImageLength, height)
+        tags.set(Tag.BitsPerSample, 12)
+        tags.set(Tag.SamplesPerPixel, 1)
+        tags.set(Tag.PhotometricInterpretation, PhotometricInterpretation.Color_Filter_Array)
+        tags.set(Tag.CFARepeatPatternDim, [2, 2])
+        tags.set(Tag.CFAPattern, [0, 1, 1, 2])
+        tags.set(Tag.WhiteLevel, 4095)
+        tags.set(Tag.Make, 'Synthetic')
+        tags.set(Tag.Model, 'Bench')
+        converter = RAW2DNG()
+        converter.options(tags, path=os.path.dirname(path), compress=False)
+        converter.convert(bayer, filename=os.path.splitext(os.path.basename(path))[0])
+        return True
+    if bit_depth == 16 or ext in ('.png', '.tif'):
+        # OpenCV写入BGR顺序，16位PNG/TIFF只能由OpenCV写入
+        return bool(cv.imwrite(path, np.ascontiguousarray(pixels[:, :, ::-1])))
+    if name in ('heic', 'avif'):
+        from core.image_probe import ensure_heif_opener
+        ensure_heif_opener()
+    Image.fromarray(pixels).save(path, quality=90)
+    return True
+
+
+def build_corpus(directory, sizes, names):
+    """
+    生成合成图片集，已存在的文件不重复生成
+
+    Returns:
+        dict: 输入格式 -> [(文件路径, 百万像素), ...]
+    """
+    os.makedirs(directory, exist_ok=True)
+    corpus = {}
+    for name in names:
+        for index, megapixels in enumerate(sizes):
+            ext, bit_depth = CORPUS_FORMATS[name]
+            path = os.path.join(directory, f"{name}_{megapixels}mp{ext}")
+            pixels = None
+            if not os.path.exists(path):
+                pixels = make_pixels(megapixels, bit_depth, SEED + index)
+                if not write_corpus_file(path, name, pixels):
+                    print(f"跳过 {name}: 缺少依赖", file=sys.stderr)
+                    break
+            height, width = (pixels.shape[:2] if pixels is not None else _probe_size(path))
+            corpus.setdefault(name, []).append((path, width * height / 1e6))
+    return corpus
+
+
+def _probe_size(path):
+    """读取已生成图片的尺寸 (高, 宽)"""
+    from core.image_probe import probe_image
+    width, height = probe_image(path).size
+    return height, width
+
+
+def _result(seconds, images, megapixels, peak):
+    """汇总单项测试结果"""
+    return {
+        'seconds': round(seconds, 4),
+        'images': images,
+        'images_per_sec': round(images / seconds, 3) if seconds else None,
+        'mp_per_sec': round(megapixels / seconds, 3) if seconds else None,
+        'peak_rss_mb': round(peak / 1024 / 1024, 1),
+    }
+
+
+def bench_convert(files, output_format, output_dir, bit_depth):
+    """测试一组输入文件转换为指定格式（在独立进程中运行，峰值内存互不影响）"""
+    from services.conversion_service import ConversionService
+    service = ConversionService()
+    records = []
+    os.makedirs(output_dir, exist_ok=True)
+    paths = [path for path, _ in files]
+    start = time.perf_counter()
+    service.convert_images(paths, output_dir, output_format, quality=85, bit_depth=bit_depth,
+                           replace=True, result_callback=records.append)
+    seconds = time.perf_counter() - start
+    failed = [r['error'] for r in records if r['status'] != 'success']
+    result = _result(seconds, len(paths), sum(mp for _, mp in files), peak_rss_bytes())
+    if failed:
+        result['errors'] = failed
+    return result
+
+
+def bench_thumbnails(files):
+    """测试缩略图生成（不使用磁盘缓存）"""
+    from PySide6.QtCore import QSize
+    from managers.thumbnail_manager import ThumbnailWorker
+    start = time.perf_counter()
+    for path, _ in files:
+        ThumbnailWorker(path, QSize(100, 100)).run()
+    seconds = time.perf_counter() - start
+    return _result(seconds, len(files), sum(mp for _, mp in files), peak_rss_bytes())
+
+
+def bench_conflict_scan(work_dir, count):
+    """测试冲突预扫描：输出目录已有count个文件，输入count个同名文件"""
+    from services.conversion_service import ConversionService
+    output_dir = os.path.join(work_dir, 'conflicts')
+    os.makedirs(output_dir, exist_ok=True)
+    for i in range(count):
+        open(os.path.join(output_dir, f"IMG_{i:06d}.jpg"), 'wb').close()
+    image_files = [f"/photos/IMG_{i:06d}.CR3" for i in range(count)]
+    service = ConversionService()
+    start = time.perf_counter()
+    output_index = service.build_output_index(output_dir)
+    service._scan_for_conflicts(image_files, output_dir, 'JPEG', False, output_index=output_index)
+    seconds = time.perf_counter() - start
+    return _result(seconds, count, 0, peak_rss_bytes())
+
+
+def run(args):
+    """执行全部基准测试"""
+    sizes = [float(s) if '.' in s else int(s) for s in args.sizes.split(',')]
+    names = [n for n in CORPUS_FORMATS if not args.inputs or n in args.inputs.split(',')]
+    work_dir = args.work_dir or os.path.join(tempfile.gettempdir(), 'image_convert_bench')
+    output_formats = args.formats.upper().split(',')
+
+    results = {}
+    # 每项测试在只执行一个任务就退出的子进程中运行，峰值内存只属于该项测试
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(1, maxtasksperchild=1) as pool:
+        # 合成图片集也在子进程中生成，主进程内存保持较小，子进程不会继承其峰值
+        corpus = pool.apply(build_corpus, (os.path.join(work_dir, 'corpus'), sizes, names))
+        jobs = []
+        for name, files in corpus.items():
+            for output_format in output_formats:
+                output_dir = os.path.join(work_dir, 'out', f"{name}_{output_format}")
+                # 16位输入转PNG/TIFF时保持16位，其余输出8位
+                bit_depth = 16 if CORPUS_FORMATS[name][1] == 16 and output_format in ('PNG', 'TIFF') else 8
+                jobs.append((f"convert/{name}->{output_format}", bench_convert, (files, output_format, output_dir, bit_depth)))
+        jobs.append(('thumbnails', bench_thumbnails, ([f for files in corpus.values() for f in files],)))
+        jobs.append(('conflict_scan', bench_conflict_scan, (work_dir, args.conflicts)))
+        
+        for key, func, func_args in jobs:
+            try:
+                result = pool.apply(func, func_args)
+            except ImportError as e:
+                print(f"跳过 {key}: {e}", file=sys.stderr)
+                continue
+            results[key] = result
+            print(f"{key:>28}: {result['seconds']:.3f}s  {result['images_per_sec']} 张/s  "
+                  f"{result['mp_per_sec']} MP/s  峰值 {result['peak_rss_mb']} MB", file=sys.stderr)
+    shutil.rmtree(os.path.join(work_dir, 'out'), ignore_errors=True)
+    shutil.rmtree(os.path.join(work_dir, 'conflicts'), ignore_errors=True)
+
+    report = {
+        'meta': {
+            'seed': SEED,
+            'sizes_mp': sizes,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+        },
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入 {args.output}", file=sys.stderr)
+
+
+def compare(old_path, new_path):
+    """对比两次运行结果，输出耗时和峰值内存的变化"""
+    with open(old_path, encoding='utf-8') as f:
+        old = json.load(f)['results']
+    with open(new_path, encoding='utf-8') as f:
+        new = json.load(f)['results']
+    print(f"{'测试项':>28}  {'旧耗时':>9}  {'新耗时':>9}  {'加速比':>6}  {'旧峰值MB':>8}  {'新峰值MB':>8}")
+    for key in [k for k in old if k in new]:
+        a, b = old[key], new[key]
+        speedup = a['seconds'] / b['seconds'] if b['seconds'] else float('inf')
+        print(f"{key:>28}  {a['seconds']:>9.3f}  {b['seconds']:>9.3f}  {speedup:>6.2f}  "
+              f"{a['peak_rss_mb']:>8}  {b['peak_rss_mb']:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.bench_conversion', description='图片转换基准测试')
+    parser.add_argument('-o', '--output', default='bench_results.json', help='结果JSON文件')
+    parser.add_argument('--sizes', default='1,4,12', help='合成图片尺寸（百万像素），逗号分隔')
+    parser.add_argument('--inputs', default='', help='输入格式，逗号分隔，默认全部: ' + ','.join(CORPUS_FORMATS))
+    parser.add_argument('--formats', default='JPEG,PNG,TIFF,WEBP,HEIC,AVIF', help='输出格式，逗号分隔')
+    parser.add_argument('--conflicts', type=int, default=20000, help='冲突扫描测试的文件数量')
+    parser.add_argument('--work-dir', help='合成图片集和输出目录，默认在系统临时目录')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='对比两次运行的结果')
+    args = parser.parse_args()
+    if args.compare:
+        compare(*args.compare)
+    else:
+        run(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+文件集合基准测试
+对比 列表去重/删除/查找 与 FileCollection 在大规模文件列表下的耗时，
+两种实现执行相同的操作；查找的是删除后仍保留的文件，计入删除后重建索引的开销。
+原先基于list的实现是平方复杂度，只在不超过LIST_MAX_COUNT的规模下运行，
+FileCollection同时在该规模（对照）和完整规模下运行
+
+用法: python -m benchmarks.bench_file_collection [文件数量，默认100000]
+"""
+import sys
+import time
+
+from core.file_collection import FileCollection
+
+# list实现的规模上限，耗时按平方增长，100k文件时仅重复添加一步就需要约2.5分钟
+LIST_MAX_COUNT = 20000
+
+
+def _timed(func):
+    """执行函数并返回耗时（秒）"""
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def bench_list(paths, extra, selected, lookups):
+    """原先基于list的实现"""
+    image_files = []
+    results = {}
+    results['add'] = _timed(lambda: image_files.extend([f for f in paths if f not in image_files]))
+    results['add_again'] = _timed(lambda: image_files.extend([f for f in paths + extra if f not in image_files]))
+    
+    def remove():
+        image_files[:] = [f for f in image_files if f not in selected]
+    
+    results['remove'] = _timed(remove)
+    results['lookup'] = _timed(lambda: [image_files.index(f) for f in lookups])
+    return results, [image_files.index(f) for f in lookups]
+
+
+def bench_collection(paths, extra, selected, lookups):
+    """FileCollection实现"""
+    files = FileCollection()
+    results = {}
+    results['add'] = _timed(lambda: files.extend(paths))
+    results['add_again'] = _timed(lambda: files.extend(paths + extra))
+    results['remove'] = _timed(lambda: files.remove_rows([files.index_of(f) for f in selected]))
+    results['lookup'] = _timed(lambda: [files.index_of(f) for f in lookups])
+    return results, [files.index_of(f) for f in lookups]
+
+
+def make_workload(n):
+    """
+    生成n个文件的操作：追加1000个新文件，删除约1000个分散的文件，再查找约1000个删除后仍保留的文件
+
+    Returns:
+        tuple: (paths, extra, selected, lookups)
+    """
+    paths = [f"/photos/{i // 1000:03d}/IMG_{i:06d}.CR3" for i in range(n)]
+    extra = [f"/photos/new/IMG_{i:06d}.CR3" for i in range(1000)]
+    selected = paths[::max(1, n // 1000)]
+    removed = set(selected)
+    survivors = [f for f in paths + extra if f not in removed]
+    lookups = survivors[::max(1, len(survivors) // 1000)]
+    return paths, extra, selected, lookups
+
+
+def _report(name, n, results, workload, note=''):
+    """输出一行结果"""
+    _, _, selected, lookups = workload
+    print(f"{name:>15} n={n:>7}: " + ", ".join(f"{k} {v * 1000:.1f}ms" for k, v in results.items())
+          + f" ({len(selected)} removed, {len(lookups)} lookups){note}")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    list_n = min(n, LIST_MAX_COUNT)
+    
+    # 相同规模下的对照，两种实现删除后的行号应完全一致
+    workload = make_workload(list_n)
+    note = f" [list实现限制为{LIST_MAX_COUNT}个文件]" if list_n < n else ''
+    list_results, list_rows = bench_list(*workload)
+    _report('list', list_n, list_results, workload, note)
+    results, rows = bench_collection(*workload)
+    _report('FileCollection', list_n, results, workload)
+    assert rows == list_rows
+    
+    if n > list_n:
+        workload = make_workload(n)
+        results, _ = bench_collection(*workload)
+        _report('FileCollection', n, results, workload)
+
+
+if __name__ == '__main__':
+    main()
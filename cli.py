@@ -0,0 +1,186 @@
+"""
+命令行入口
+无界面批量转换图片，不导入任何Qt模块，可在无显示环境的渲染节点上运行
+
+用法:
+    python -m cli 输入文件或目录... -o 输出目录 -f WEBP -q 85 -j 8
+"""
+import argparse
+import contextlib
+import json
+import os
+import signal
+import sys
+import time
+
+from core.memory_budget import parse_size
+from core.progress import ProgressAggregator, format_progress
+from core.result_cache import ResultCache
+from core.stage_timer import summarize, write_report
+from core.utils import iter_image_files
+from services.conversion_service import ConversionService
+
+
+def parse_args(argv=None):
+    """解析命令行参数"""
+    formats = ConversionService().get_supported_formats()
+    parser = argparse.ArgumentParser(prog='python -m cli', description='批量转换图片格式')
+    parser.add_argument('inputs', nargs='+', help='输入图片文件或目录')
+    parser.add_argument('-o', '--output-dir', required=True, help='输出目录')
+    parser.add_argument('-f', '--format', default='original', type=str.upper,
+                        choices=formats + ['ORIGINAL'], help='输出格式，ORIGINAL表示保持原格式（指定缩放时RAW文件无法按原格式重新编码，将被跳过）')
+    parser.add_argument('-q', '--quality', type=int, default=None, help='输出质量(1-100)，原格式默认100，其余默认85')
+    parser.add_argument('-b', '--bit-depth', type=int, default=None, choices=[8, 10, 12, 16],
+                        help='输出位深，原格式默认保持原位深，其余默认8位')
+    parser.add_argument('--replace', action='store_true', help='替换输出目录中的同名文件')
+    parser.add_argument('-r', '--recursive', action='store_true', help='递归扫描输入目录的子目录')
+    resize = parser.add_mutually_exclusive_group()
+    resize.add_argument('--max-size', type=int, metavar='N', help='长边缩放到不超过N像素')
+    resize.add_argument('--box', metavar='WxH', help='缩放到能放入 宽x高 的最大尺寸')
+    resize.add_argument('--scale', type=float, metavar='F', help='按比例缩放，如0.5')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1, help='并行转换进程数')
+    parser.add_argument('--memory-budget', type=parse_size, metavar='SIZE',
+                        help='并行转换时进行中任务的估算内存总和上限，如24G，大图自动串行、小图并行')
+    parser.add_argument('--cache-dir', metavar='DIR', help='转换结果缓存目录，相同内容和参数的图片直接使用缓存的输出')
+    parser.add_argument('--cache-size', type=parse_size, default='10G', metavar='SIZE', help='结果缓存容量上限，默认10G')
+    parser.add_argument('--cache-hardlink', action='store_true',
+                        help='命中缓存时用硬链接生成输出，节省空间；输出与缓存共享数据，因此为只读文件')
+    parser.add_argument('--no-journal', action='store_true', help='不使用任务日志，重新转换所有文件')
+    parser.add_argument('--incremental', action='store_true',
+                        help='增量模式：只转换新增或变化的源文件，参数或源文件变化后的旧输出直接覆盖')
+    parser.add_argument('--verify-hash', action='store_true', help='记录并比较源文件内容哈希，修改时间变化但内容相同的文件不重新转换')
+    parser.add_argument('--progress', action='store_true', help='在stderr显示进度、吞吐量和剩余时间')
+    parser.add_argument('--report', metavar='PATH', help='导出分阶段计时报告，扩展名为.csv时导出CSV，否则导出JSON')
+    return parser.parse_args(argv)
+
+
+def get_resize(args):
+    """
+    根据命令行参数生成缩放参数
+
+    Returns:
+        tuple or None: 缩放参数
+    """
+    if args.max_size:
+        return ('long_edge', args.max_size)
+    if args.box:
+        width, height = args.box.lower().split('x')
+        return ('box', int(width), int(height))
+    if args.scale:
+        return ('scale', args.scale)
+    return None
+
+
+def collect_files(inputs, recursive):
+    """
+    收集输入图片，目录按扩展名过滤，保持输入顺序并去重
+
+    Returns:
+        list: 图片文件路径列表
+    """
+    files = []
+    for path in inputs:
+        if os.path.isdir(path):
+            files.extend(iter_image_files(path, recursive=recursive))
+        elif os.path.isfile(path):
+            files.append(path)
+        else:
+            print(f"输入不存在: {path}", file=sys.stderr)
+    return list(dict.fromkeys(files))
+
+
+def main(argv=None):
+    """
+    命令行主函数
+
+    Returns:
+        int: 退出码，有文件转换失败时为1
+    """
+    args = parse_args(argv)
+    output_format = None if args.format == 'ORIGINAL' else args.format
+    quality = args.quality if args.quality is not None else (100 if output_format is None else 85)
+    bit_depth = args.bit_depth if args.bit_depth is not None or output_format is None else 8
+
+    image_files = collect_files(args.inputs, args.recursive)
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    records = []
+    progress = None
+    if args.progress:
+        # 终端中原地刷新一行（每秒10次），重定向到文件时每秒输出一行
+        if sys.stderr.isatty():
+            progress = ProgressAggregator(len(image_files), lambda s: print('\r' + format_progress(s), end='', file=sys.stderr, flush=True))
+        else:
+            progress = ProgressAggregator(len(image_files), lambda s: print(format_progress(s), file=sys.stderr, flush=True), interval=1.0)
+
+    def on_result(record):
+        records.append(record)
+        if progress:
+            progress.update(record)
+
+    start = time.perf_counter()
+    # 转换期间把文件描述符1也指向stderr，子进程和C扩展直接写出的日志不会混入stdout的JSON结果
+    sys.stdout.flush()
+    stdout_fd = os.dup(1)
+    os.dup2(2, 1)
+    service = ConversionService()
+    result_cache = ResultCache(args.cache_dir, args.cache_size, args.cache_hardlink) if args.cache_dir else None
+    service.reset_cancel()
+
+    def on_interrupt(signum, frame):
+        # 第一次Ctrl+C取消转换：正在处理的文件在下一个阶段前停止，已完成的文件记录在任务日志中，再次运行时跳过；
+        # 之后恢复默认处理，再次按Ctrl+C立即终止，不等待长时间的编码
+        service.cancel()
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        print("正在取消转换，再次按Ctrl+C立即退出", file=sys.stderr)
+
+    signal.signal(signal.SIGINT, on_interrupt)
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            service.convert_images(
+                image_files,
+                args.output_dir,
+                output_format,
+                quality=quality,
+                bit_depth=bit_depth,
+                replace=args.replace,
+                workers=args.jobs,
+                memory_budget=args.memory_budget,
+                result_cache=result_cache,
+                resize=get_resize(args),
+                result_callback=on_result,
+                journal=not args.no_journal,
+                incremental=args.incremental,
+                verify_hash=args.verify_hash
+            )
+    finally:
+        if progress:
+            progress.close()
+            if sys.stderr.isatty():
+                print(file=sys.stderr)
+        os.dup2(stdout_fd, 1)
+        os.close(stdout_fd)
+        if result_cache:
+            result_cache.close()
+
+    summary = {
+        'total': len(records),
+        'success': sum(r['status'] == 'success' for r in records),
+        'failed': sum(r['status'] == 'failed' for r in records),
+        'skipped': sum(r['status'] == 'skipped' for r in records),
+        'cancelled': sum(r['status'] == 'cancelled' for r in records),
+        'resumed': sum(r['status'] == 'resumed' for r in records),
+        'cached': sum('cache' in r['stages'] for r in records),
+        'seconds': round(time.perf_counter() - start, 3),
+        'stage_totals': summarize(records),
+        'files': records,
+    }
+    if args.report:
+        write_report(records, args.report)
+    json.dump(summary, sys.stdout, ensure_ascii=False, indent=2)
+    sys.stdout.write('\n')
+    return 1 if summary['failed'] or summary['cancelled'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
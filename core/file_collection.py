@@ -0,0 +1,107 @@
+"""
+文件集合模块
+有序的文件路径列表，同时维护 路径 -> 行号 的哈希索引
+"""
+
+
+class FileCollection:
+    """带索引的有序文件路径集合，成员判断和行号查找均为O(1)"""
+    
+    def __init__(self, paths=()):
+        self.paths = []
+        self._rows = {}  # 文件路径 -> 行号
+        self._dirty_from = None  # 删除后从该行开始的索引需要重建
+        self.extend(paths)
+    
+    def __len__(self):
+        return len(self.paths)
+    
+    def __iter__(self):
+        return iter(self.paths)
+    
+    def __getitem__(self, row):
+        return self.paths[row]
+    
+    def __contains__(self, path):
+        return path in self._rows
+    
+    def index_of(self, path):
+        """
+        获取文件所在行号
+        
+        Args:
+            path: 文件路径
+        
+        Returns:
+            int or None: 行号，不在集合中时返回None
+        """
+        if path not in self._rows:
+            return None
+        if self._dirty_from is not None:
+            self._reindex()
+        return self._rows[path]
+    
+    def filter_new(self, paths):
+        """
+        过滤出不在集合中的文件（同时去除输入中的重复项）
+        
+        Returns:
+            list: 新文件路径列表
+        """
+        return [p for p in dict.fromkeys(paths) if p not in self._rows]
+    
+    def extend(self, paths):
+        """
+        追加文件，已存在的文件会被忽略
+        
+        Returns:
+            list: 实际追加的文件路径列表
+        """
+        new_paths = self.filter_new(paths)
+        if self._dirty_from is not None:
+            self._reindex()
+        start = len(self.paths)
+        self.paths.extend(new_paths)
+        for row, path in enumerate(new_paths, start):
+            self._rows[path] = row
+        return new_paths
+    
+    def remove_range(self, first, last):
+        """删除 first 到 last（含）行，行号索引延迟到下次查找时重建"""
+        for path in self.paths[first:last + 1]:
+            del self._rows[path]
+        del self.paths[first:last + 1]
+        self._dirty_from = first if self._dirty_from is None else min(self._dirty_from, first)
+    
+    def remove_rows(self, rows):
+        """按连续区间删除多行，从后往前删除以保持行号有效"""
+        for first, last in reversed(self.row_ranges(rows)):
+            self.remove_range(first, last)
+    
+    def clear(self):
+        """清空集合"""
+        self.paths.clear()
+        self._rows.clear()
+        self._dirty_from = None
+    
+    @staticmethod
+    def row_ranges(rows):
+        """
+        将行号合并为连续区间
+        
+        Returns:
+            list: [(起始行, 结束行), ...]，按行号升序
+        """
+        ranges = []
+        for row in sorted(set(rows)):
+            if ranges and row == ranges[-1][1] + 1:
+                ranges[-1][1] = row
+            else:
+                ranges.append([row, row])
+        return [tuple(r) for r in ranges]
+    
+    def _reindex(self):
+        """重建删除位置之后的行号索引"""
+        for row in range(self._dirty_from, len(self.paths)):
+            self._rows[self.paths[row]] = row
+        self._dirty_from = None
@@ -0,0 +1,128 @@
+"""
+输出文件写入模块
+所有输出先写入同目录下的临时文件，完成后再原子替换到目标位置，
+程序崩溃或取消时不会留下被当作有效输出的不完整文件；
+原样复制优先使用reflink和copy_file_range，在内核中完成复制
+"""
+import errno
+import os
+import shutil
+import sys
+from contextlib import contextmanager
+
+# Linux的FICLONE ioctl，Btrfs、XFS等文件系统上共享数据块，复制瞬间完成
+_FICLONE = 0x40049409
+
+# 这些错误表示当前文件系统或内核不支持该复制方式，改用下一种方式
+_UNSUPPORTED_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTTY, errno.EBADF, errno.EPERM}
+
+
+def temp_path(path):
+    """
+    生成与目标文件同目录的临时文件路径，保留扩展名以便按扩展名选择编码器的库写入
+
+    Args:
+        path: 目标文件路径
+
+    Returns:
+        str: 临时文件路径，如 "输出目录/.IMG_0001.1234.tmp.jpg"
+    """
+    directory, name = os.path.split(path)
+    stem, ext = os.path.splitext(name)
+    return os.path.join(directory, f".{stem}.{os.getpid()}.tmp{ext}")
+
+
+@contextmanager
+def atomic_output(path):
+    """
+    在with块中写入临时文件，正常结束后原子替换目标文件，出错时删除临时文件
+
+    Args:
+        path: 目标文件路径
+
+    Yields:
+        str: 临时文件路径
+    """
+    temp = temp_path(path)
+    try:
+        yield temp
+        os.replace(temp, path)
+    except BaseException:
+        try:
+            os.remove(temp)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write(path, data):
+    """
+    原子写入文件内容
+
+    Args:
+        path: 目标文件路径
+        data: 字节数据（bytes或支持缓冲区协议的对象）
+    """
+    with atomic_output(path) as temp:
+        with open(temp, 'wb') as f:
+            f.write(data)
+
+
+def fast_copy(source, destination):
+    """
+    复制文件内容、权限和时间戳（同shutil.copy2），原子替换目标文件
+
+    Args:
+        source: 源文件路径
+        destination: 目标文件路径
+    """
+    with atomic_output(destination) as temp:
+        copy_data(source, temp)
+        shutil.copystat(source, temp)
+
+
+def copy_data(source, destination):
+    """
+    复制文件内容：依次尝试reflink、copy_file_range，都不支持时由shutil.copyfile复制
+    （Linux上使用sendfile，macOS上使用fcopyfile，同样不经过用户态缓冲区）
+
+    Args:
+        source: 源文件路径
+        destination: 目标文件路径，已存在时被覆盖
+    """
+    if sys.platform.startswith('linux'):
+        with open(source, 'rb') as src, open(destination, 'wb') as dst:
+            if _reflink(src.fileno(), dst.fileno()) or _copy_file_range(src.fileno(), dst.fileno()):
+                return
+    shutil.copyfile(source, destination)
+
+
+def _reflink(src_fd, dst_fd):
+    """尝试reflink克隆，返回是否成功"""
+    import fcntl
+    try:
+        fcntl.ioctl(dst_fd, _FICLONE, src_fd)
+        return True
+    except OSError as e:
+        if e.errno in _UNSUPPORTED_ERRNOS:
+            return False
+        raise
+
+
+def _copy_file_range(src_fd, dst_fd):
+    """尝试用copy_file_range在内核中复制全部内容，返回是否成功"""
+    if not hasattr(os, 'copy_file_range'):
+        return False
+    size = os.fstat(src_fd).st_size
+    offset = 0
+    try:
+        while offset < size:
+            copied = os.copy_file_range(src_fd, dst_fd, min(size - offset, 1 << 30), offset, offset)
+            if copied == 0:
+                break
+            offset += copied
+    except OSError as e:
+        if offset == 0 and e.errno in _UNSUPPORTED_ERRNOS:
+            return False
+        raise
+    return offset == size
@@ -1,39 +1,90 @@
-from PIL import Image
-import pyexiv2
-import io
+import struct
 
-def get_exif_data(input_path):
-    # 从文件中读取EXIF数据
-    try:
-        # 1. 使用 pyexiv2 打开源文件
-        with pyexiv2.Image(input_path, encoding='GBK') as img_src:
-            
-            # 2. 在内存中创建一个新的、极简的JPEG图片作为元数据的“容器”
-            # 这个容器只用于传递元数据给Pillow，本身几乎不占空间
-            # pyexiv2 需要一个有效的图片结构来写入元数据
-            blank_image_data = b'\xff\xd8\xff\xe0\x00\x10JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00\xff\xdb\x00C\x00\x08\x06\x06\x07\x06\x05\x08\x07\x07\x07\t\t\x08\n\x0c\x14\r\x0c\x0b\x0b\x0c\x19\x12\x13\x0f\x14\x1d\x1a\x1f\x1e\x1d\x1a\x1c\x1c $.\' ",#\x1c\x1c(7),01444\x1f\'9=82<.342\xff\xc0\x00\x0b\x08\x00\x01\x00\x01\x01\x01\x11\x00\xff\xc4\x00\x14\x00\x01\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x03\xff\xda\x00\x08\x01\x01\x00\x00\x00\x00\x1f\xff\xd9'
+# 极简的1x1 JPEG，作为HEIF/AVIF输出时承载元数据的内存容器
+BLANK_JPEG = b'\xff\xd8\xff\xe0\x00\x10JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00\xff\xdb\x00C\x00\x08\x06\x06\x07\x06\x05\x08\x07\x07\x07\t\t\x08\n\x0c\x14\r\x0c\x0b\x0b\x0c\x19\x12\x13\x0f\x14\x1d\x1a\x1f\x1e\x1d\x1a\x1c\x1c $.\' ",#\x1c\x1c(7),01444\x1f\'9=82<.342\xff\xc0\x00\x0b\x08\x00\x01\x00\x01\x01\x01\x11\x00\xff\xc4\x00\x14\x00\x01\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x03\xff\xda\x00\x08\x01\x01\x00\x00\x00\x00\x1f\xff\xd9'
 
-            with pyexiv2.ImageData(data=blank_image_data) as img_target:
-                # 3. 清理目标容器的元数据（虽然是空白的，但这是个好习惯）
-                img_target.clear_exif()
-                img_target.clear_iptc()
-                img_target.clear_xmp()
+# JPEG中APP1段的标识
+EXIF_HEADER = b'Exif\x00\x00'
+XMP_HEADER = b'http://ns.adobe.com/xap/1.0/\x00'
 
-                # 4. 将源文件的元数据复制到内存中的目标容器
-                img_src.copy_to_another_image(img_target, exif=True, iptc=True, xmp=True, comment=False, icc=False, thumbnail=False)
-                
-                # 5. 从目标容器获取带有新元数据的图片字节流
-                modified_image_bytes = img_target.get_bytes()
 
-        # 6. 使用io.BytesIO将字节流包装成一个内存中的文件对象
-        image_stream = io.BytesIO(modified_image_bytes)
-
-        # 7. Pillow 从内存中的文件对象读取图片并获取EXIF
-        with Image.open(image_stream) as exif_trans:
-            exif_data = exif_trans.getexif()
-
-        return exif_data
-
-    except Exception as e:
-        print(f"处理图片时发生错误: {e}")
-        return None
\ No newline at end of file
+class SourceMetadata:
+    """
+    源文件元数据
+    每个文件只用pyexiv2解析一次，再按输出格式支持的方式写入输出文件
+    """
+    
+    def __init__(self, input_path):
+        """
+        打开源文件并解析元数据，解析失败时不写入元数据
+        
+        Args:
+            input_path: 源文件路径
+        """
+        self._image = None
+        try:
+            # pyexiv2导入较慢，只在处理RAW文件时才导入
+            import pyexiv2
+            # RAW中指向传感器数据的标签无法写入输出文件，exiv2会对此逐个告警，只保留错误日志
+            pyexiv2.set_log_level(3)
+            self._image = pyexiv2.Image(input_path, encoding='GBK')
+        except Exception as e:
+            print(f"读取元数据失败 {input_path}: {e}")
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def close(self):
+        """关闭源文件句柄"""
+        if self._image is not None:
+            self._image.close()
+            self._image = None
+    
+    def write_to(self, path):
+        """
+        将EXIF、IPTC和XMP原地写入已编码的输出文件（JPEG、PNG、TIFF、WEBP）
+        
+        Args:
+            path: 输出文件路径
+        """
+        if self._image is None:
+            return
+        import pyexiv2
+        with pyexiv2.Image(path, encoding='GBK') as target:
+            self._image.copy_to_another_image(target, exif=True, iptc=True, xmp=True, comment=False, icc=False, thumbnail=False)
+    
+    def save_kwargs(self):
+        """
+        获取HEIF/AVIF编码器保存时使用的元数据参数
+        exiv2无法写入这些格式，先复制到内存中的JPEG容器，再直接取出EXIF和XMP段的字节
+        
+        Returns:
+            dict: 可传给save()的exif、xmp参数
+        """
+        if self._image is None:
+            return {}
+        import pyexiv2
+        try:
+            with pyexiv2.ImageData(BLANK_JPEG) as container:
+                self._image.copy_to_another_image(container, exif=True, iptc=False, xmp=True, comment=False, icc=False, thumbnail=False)
+                data = container.get_bytes()
+        except Exception as e:
+            print(f"处理元数据时发生错误: {e}")
+            return {}
+        
+        kwargs = {}
+        # 遍历JPEG标记段，直到图像数据开始(SOS)
+        pos = 2
+        while pos + 4 <= len(data) and data[pos] == 0xFF and data[pos + 1] != 0xDA:
+            length = struct.unpack('>H', data[pos + 2:pos + 4])[0]
+            payload = data[pos + 4:pos + 2 + length]
+            if data[pos + 1] == 0xE1:
+                if payload.startswith(EXIF_HEADER):
+                    kwargs['exif'] = payload
+                elif payload.startswith(XMP_HEADER):
+                    kwargs['xmp'] = payload[len(XMP_HEADER):]
+            pos += 2 + length
+        return kwargs
@@ -1,105 +1,189 @@
 import os
-import cv2 as cv
 from PIL import Image
-from pillow_heif import register_heif_opener
-import rawpy
-import pyexiv2
-from .get_exif import get_exif_data
+from .get_exif import SourceMetadata
+from .image_probe import RAW_EXTENSIONS, HEIF_EXTENSIONS, ensure_heif_opener
+from .file_ops import atomic_output
+from .image_resize import target_size
+from .stage_timer import StageTimer
 
-register_heif_opener()
+# cv2、rawpy、pyexiv2、pillow_heif导入耗时较长，在首次用到时才导入，加快程序启动
 
 class ImageConverter:
     def __init__(self):
         pass
 
-    def convert(self, input_path, output_path, format_name, quality=85, bit_depth=8):
-        """转换图像格式"""
+    def convert(self, input_path, output_path, format_name, quality=85, bit_depth=8, resize=None, timer=None):
+        """
+        转换图像格式
+        
+        Args:
+            resize: 缩放参数（见image_resize模块），为None时保持原尺寸
+            timer: 分阶段计时器，记录各阶段耗时和读写字节数
+        """
+        timer = timer or StageTimer()
+        timer.bytes_read += os.path.getsize(input_path)
         # 判断输入类型是raw还是普通图片
-        raw_extensions = {
-            '.cr2', '.cr3', '.nef', '.nrw', '.arw', '.srf', '.sr2',
-            '.dng', '.orf', '.rw2', '.rwl', '.pef', '.ptx',
-            '.3fr', '.fff', '.mef', '.mos', '.erf', '.dcr', '.kdc',
-            '.raw', '.raf', '.x3f', '.iiq'
-        }
         ext = os.path.splitext(input_path)[1].lower()
-        is_raw = ext in raw_extensions
+        is_raw = ext in RAW_EXTENSIONS
+        # 读写HEIF/AVIF时才注册pillow_heif
+        if ext in HEIF_EXTENSIONS or format_name in {'HEIC', 'HEIF', 'AVIF'}:
+            ensure_heif_opener()
         # 如果是raw的话使用rawpy读取数据
         if is_raw:
-            # 特殊处理raw的exif信息提取
-            exif_data = get_exif_data(input_path)
-            with rawpy.imread(input_path) as raw:
-                rgb = raw.postprocess(
-                    use_camera_wb=True,
-                    half_size=False,
-                    no_auto_bright=True,
-                    output_bps=16
-                )
-                # 根据得到的图像分别处理16位和8位图像
-                bgr_16 = cv.cvtColor(rgb, cv.COLOR_RGB2BGR)
+            # 解码前先确定实际输出位深：未指定时PNG/TIFF/HEIF保留16位，其余格式为8位；
+            # 只有PNG/TIFF/HEIF能写入高位深，其余格式限制为8位
+            if bit_depth is None:
+                bit_depth = 16 if format_name in {'PNG', 'TIFF', 'HEIC', 'HEIF'} else 8
+            elif bit_depth > 8 and format_name not in {'PNG', 'TIFF', 'HEIC', 'HEIF'}:
+                bit_depth = 8
+            # 源文件元数据只解析一次，再按输出格式支持的方式写入
+            with timer.stage('metadata'):
+                metadata = SourceMetadata(input_path)
+            with metadata:
+                # 每个文件只去马赛克一次，按输出位深直接解码为8位或16位
+                rgb = self._decode_raw(input_path, 8 if bit_depth == 8 else 16, resize, timer)
                 
-                # 输出图像
+                # 输出图像，直接编码到临时文件，元数据在临时文件上原地写入，完成后再替换目标文件
                 if bit_depth==8:
-                    bgr_8 = raw.postprocess(
-                        use_camera_wb=True,
-                        half_size=False,
-                        no_auto_bright=True,
-                        output_bps=8
-                    )
-                    img_8=Image.fromarray(bgr_8)
+                    img_8=Image.fromarray(rgb)
                     if format_name not in {'HEIC','HEIF','AVIF'}:
-                        img_8.save(output_path, quality=-1 if quality==100 else quality
-                        )
-                        with pyexiv2.Image(input_path,encoding='GBK') as img1:
-                            with pyexiv2.Image(output_path,encoding='GBK') as img2:
-                                img1.copy_to_another_image(img2, exif=True, iptc=True, xmp=True, comment=False, icc=False, thumbnail=False)
+                        with atomic_output(output_path) as temp:
+                            with timer.stage('encode+write'):
+                                self._save_pil(img_8, temp, **self._quality_kwargs(format_name, quality))
+                            with timer.stage('metadata'):
+                                metadata.write_to(temp)
                     elif format_name in {'HEIC','HEIF','AVIF'}:
-                        img_8.save(output_path, quality=-1 if quality==100 else quality,
-                            exif=exif_data
-                        )
+                        with timer.stage('metadata'):
+                            metadata_kwargs = metadata.save_kwargs()
+                        with atomic_output(output_path) as temp, timer.stage('encode+write'):
+                            self._save_pil(img_8, temp, **self._quality_kwargs(format_name, quality),
+                                **metadata_kwargs
+                            )
                 elif bit_depth>8 and format_name in {'HEIC', 'HEIF'}:
                     # 处理输出heif格式
-                    heif_file = ph.from_bytes(
-                        mode="RGB;16",
-                        size=(rgb.shape[1], rgb.shape[0]),
-                        data=bytes(rgb)
-                    )
-                    if bit_depth==12:
-                        ph.options.SAVE_HDR_TO_12_BIT = True
-                        heif_file.save(output_path, quality=-1 if quality==100 else quality,
-                            exif=exif_data
+                    import numpy as np
+                    import pillow_heif as ph
+                    with timer.stage('metadata'):
+                        metadata_kwargs = metadata.save_kwargs()
+                    with atomic_output(output_path) as temp, timer.stage('encode+write'):
+                        # 通过缓冲区协议直接传递连续数组，避免bytes()复制整幅16位图像
+                        heif_file = ph.from_bytes(
+                            mode="RGB;16",
+                            size=(rgb.shape[1], rgb.shape[0]),
+                            data=memoryview(np.ascontiguousarray(rgb))
                         )
-                    else:  
-                        heif_file.save(output_path, quality=-1 if quality==100 else quality,
-                            exif=exif_data
+                        ph.options.SAVE_HDR_TO_12_BIT = bit_depth==12
+                        heif_file.save(temp, **self._quality_kwargs(format_name, quality),
+                            **metadata_kwargs
                         )
                 elif bit_depth>8 and format_name in {'PNG','TIFF'}:
-                    # 处理输出png、tiff格式
-                    try:
-                        if format_name=='PNG':
-                            cv.imwrite(output_path, bgr_16,
-                                [cv.IMWRITE_PNG_COMPRESSION, 9]
-                            )
-                        elif format_name=='TIFF':
-                            cv.imwrite(output_path, bgr_16,
-                                [cv.IMWRITE_TIFF_COMPRESSION, 32946]
-                            )
-                    except Exception as e:
-                        return (False,f"转换失败：{str(e)}")
-                    with pyexiv2.Image(input_path,encoding='GBK') as img1:
-                        with pyexiv2.Image(output_path,encoding='GBK') as img2:
-                            img1.copy_to_another_image(img2, exif=True, iptc=True, xmp=True, comment=False, icc=False, thumbnail=False)
+                    # 处理输出png、tiff格式，只有OpenCV写入时才需要BGR，原地转换避免额外拷贝
+                    import cv2 as cv
+                    with atomic_output(output_path) as temp:
+                        with timer.stage('encode+write'):
+                            bgr_16 = cv.cvtColor(rgb, cv.COLOR_RGB2BGR, dst=rgb)
+                            if format_name=='PNG':
+                                ok = cv.imwrite(temp, bgr_16,
+                                    [cv.IMWRITE_PNG_COMPRESSION, 9]
+                                )
+                            else:
+                                ok = cv.imwrite(temp, bgr_16,
+                                    [cv.IMWRITE_TIFF_COMPRESSION, 32946]
+                                )
+                        if not ok:
+                            raise OSError(f"转换失败：无法编码为{format_name}")
+                        with timer.stage('metadata'):
+                            metadata.write_to(temp)
         else:
-            img = Image.open(input_path)
+            with timer.stage('decode'):
+                img = Image.open(input_path)
+                exif = img.getexif()
+                target = target_size(img.size, resize)
+                if target:
+                    # JPEG在DCT域按1/2、1/4、1/8缩小解码，不生成全尺寸图像
+                    img.draft(img.mode, target)
+                img.load()
+            if target:
+                with timer.stage('resize'):
+                    # reducing_gap让Pillow先用reduce()按整数倍缩小，再精确重采样
+                    img = img.resize(target, Image.LANCZOS, reducing_gap=3.0)
             # 对于非RAW格式，使用Pillow进行转换
-            # Pillow会根据output_path的后缀名自动判断格式，无需指定format参数
-            if format_name in {'JPEG', 'WEBP', 'AVIF', 'HEIC', 'HEIF'}:
-                # 这些格式支持quality参数
-                img.save(output_path, quality=-1 if quality==100 else quality, exif=img.getexif())
-            else:
-                # 其他格式（PNG、TIFF等）不需要quality参数
-                img.save(output_path, exif=img.getexif())
+            with atomic_output(output_path) as temp, timer.stage('encode+write'):
+                if format_name in {'JPEG', 'WEBP', 'AVIF', 'HEIC', 'HEIF'}:
+                    # 这些格式支持quality参数
+                    self._save_pil(img, temp, **self._quality_kwargs(format_name, quality), exif=exif)
+                else:
+                    # 其他格式（PNG、TIFF等）不需要quality参数
+                    self._save_pil(img, temp, exif=exif)
 
+        timer.bytes_written += os.path.getsize(output_path)
         return (True,"转换成功")
 
+    def _quality_kwargs(self, format_name, quality):
+        """
+        生成编码器的质量参数，quality为100时尽量无损
+        
+        Returns:
+            dict: 传给save()的参数
+        """
+        if quality != 100:
+            return {'quality': quality}
+        if format_name == 'WEBP':
+            # WEBP编码器不接受-1，改用无损模式
+            return {'lossless': True}
+        if format_name == 'AVIF':
+            # AVIF编码器不接受-1，以最高质量编码
+            return {'quality': 100}
+        # pillow_heif的HEIC/HEIF为无损，Pillow的JPEG为编码器默认质量
+        return {'quality': -1}
+
+    def _save_pil(self, img, path, **kwargs):
+        """
+        使用Pillow直接编码写入文件，格式由扩展名决定（临时文件保留了目标文件的扩展名）
+        """
+        image_format = Image.registered_extensions()[os.path.splitext(path)[1].lower()]
+        img.save(path, format=image_format, **kwargs)
+
+    def _decode_raw(self, input_path, output_bps, resize=None, timer=None):
+        """
+        解码RAW文件（去马赛克），需要缩放时直接输出目标尺寸
+        
+        Args:
+            input_path: RAW文件路径
+            output_bps: 输出位深（8或16）
+            resize: 缩放参数，为None时保持原尺寸
+            timer: 分阶段计时器
+            
+        Returns:
+            numpy.ndarray: RGB图像数据
+        """
+        import rawpy
+        timer = timer or StageTimer()
+        with timer.stage('decode'):
+            raw = rawpy.imread(input_path)
+        with raw:
+            # 先单独解包传感器数据，区分解码和去马赛克的耗时
+            with timer.stage('decode'):
+                raw.unpack()
+            # 按旋转后的方向计算输出尺寸，flip为5或6时宽高互换
+            size = (raw.sizes.width, raw.sizes.height)
+            if raw.sizes.flip in (5, 6):
+                size = size[::-1]
+            target = target_size(size, resize)
+            # 目标尺寸不超过一半时使用half_size，跳过去马赛克直接合并2x2像素
+            half_size = bool(target) and target[0] * 2 <= size[0] and target[1] * 2 <= size[1]
+            with timer.stage('demosaic'):
+                rgb = raw.postprocess(
+                    use_camera_wb=True,
+                    half_size=half_size,
+                    no_auto_bright=True,
+                    output_bps=output_bps
+                )
+        if target and (rgb.shape[1], rgb.shape[0]) != target:
+            import cv2 as cv
+            with timer.stage('resize'):
+                rgb = cv.resize(rgb, target, interpolation=cv.INTER_AREA)
+        return rgb
+
 
         
@@ -1,5 +1,6 @@
 import os
 import cv2 as cv
+import numpy as np
 import pillow_heif as ph
 
 class ImageOutput:
@@ -7,25 +8,36 @@ class ImageOutput:
         pass
     
     def output(self,bgr,output_path,format_name,quality=85,bit_depth=8):
-        bgr_16=bgr
-        alpha_scale = 255.0 / 65535.0
-        bgr_8 = cv.convertScaleAbs(bgr_16, alpha=alpha_scale)
-        heif_file = ph.from_bytes(
-                    mode="BGRA;16",
-                    size=(bgr.shape[1], bgr.shape[0]),
-                    data=bytes(bgr)
-                )
         """输出图像"""
         # 输出图像，jpg、png、tiff、webp由opencv输出，heif、heic、avif由pillow_heif输出
+        # 8位副本和HEIF缓冲区只在所选格式需要时才创建
         if format_name == 'jpg':
             cv.imwrite(
-                output_path, bgr, [int(cv.IMWRITE_JPEG_QUALITY), quality]
+                output_path, self._to_8bit(bgr), [int(cv.IMWRITE_JPEG_QUALITY), quality]
             )
         elif format_name == 'webp':
             cv.imwrite(
-                output_path, bgr,
+                output_path, self._to_8bit(bgr),
                 [int(cv.IMWRITE_WEBP_QUALITY), quality]
             )
         elif format_name == 'png':
             png_compression = int(9 - (quality / 100.0) * 9)
             png_compression = max(0, min(9, png_compression))  # 确保在0-9范围内
+            cv.imwrite(
+                output_path, bgr,
+                [int(cv.IMWRITE_PNG_COMPRESSION), png_compression]
+            )
+        elif format_name in ('heif', 'heic'):
+            # 通过缓冲区协议直接传递连续数组，不经过bytes()复制
+            heif_file = ph.from_bytes(
+                        mode="BGRA;16" if bgr.shape[2] == 4 else "BGR;16",
+                        size=(bgr.shape[1], bgr.shape[0]),
+                        data=memoryview(np.ascontiguousarray(bgr))
+                    )
+            heif_file.save(output_path, quality=quality)
+    
+    def _to_8bit(self, bgr):
+        """JPEG、WEBP只支持8位，16位数据缩放为8位副本"""
+        if bgr.dtype == np.uint8:
+            return bgr
+        return cv.convertScaleAbs(bgr, alpha=255.0 / 65535.0)
@@ -0,0 +1,96 @@
+"""
+图像元信息探测模块
+只读取容器头部获取位深、模式和尺寸，不解码像素数据
+"""
+import os
+import struct
+from collections import namedtuple
+from functools import lru_cache
+
+from PIL import Image
+
+# RAW文件扩展名
+RAW_EXTENSIONS = {
+    '.cr2', '.cr3', '.nef', '.nrw', '.arw', '.srf', '.sr2',
+    '.dng', '.orf', '.rw2', '.rwl', '.pef', '.ptx',
+    '.3fr', '.fff', '.mef', '.mos', '.erf', '.dcr', '.kdc',
+    '.raw', '.raf', '.x3f', '.iiq'
+}
+
+# 需要pillow_heif解码的扩展名
+HEIF_EXTENSIONS = {'.heic', '.heif', '.avif'}
+
+# 图像元信息：位深、模式、尺寸(宽, 高)
+ImageInfo = namedtuple('ImageInfo', ['bit_depth', 'mode', 'size'])
+
+# Pillow高位深模式对应的位深
+_MODE_BIT_DEPTHS = {
+    'I;16': 16, 'I;16B': 16, 'I;16L': 16, 'I;16N': 16,
+    'I;12': 12, 'I;12B': 12, 'I;12L': 12,
+    'I;10': 10, 'I;10B': 10, 'I;10L': 10,
+}
+
+
+@lru_cache(maxsize=None)
+def ensure_heif_opener():
+    """注册pillow_heif的HEIF读写插件，只在首次用到HEIF/AVIF时执行一次"""
+    from pillow_heif import register_heif_opener
+    register_heif_opener()
+
+
+def probe_image(image_path):
+    """
+    探测图像的位深、模式和尺寸
+
+    结果按 路径+修改时间 缓存，同一批次内重复探测不再读取文件
+
+    Args:
+        image_path: 图像文件路径
+
+    Returns:
+        ImageInfo: 图像元信息
+    """
+    stat = os.stat(image_path)
+    return _probe(image_path, stat.st_mtime_ns, stat.st_size)
+
+
+@lru_cache(maxsize=65536)
+def _probe(image_path, mtime_ns, file_size):
+    """读取图像头部信息（由probe_image按修改时间缓存）"""
+    ext = os.path.splitext(image_path)[1].lower()
+
+    if ext in RAW_EXTENSIONS:
+        # RAW文件只解析头部，不解包传感器数据；RAW统一按16位处理
+        import rawpy
+        raw = rawpy.RawPy()
+        try:
+            raw.open_file(image_path)
+            return ImageInfo(16, 'RGB', (raw.sizes.width, raw.sizes.height))
+        finally:
+            raw.close()
+
+    if ext == '.png':
+        # PNG的IHDR块紧跟在8字节签名之后，Pillow会把16位RGB报告为8位模式
+        with open(image_path, 'rb') as f:
+            header = f.read(26)
+        if len(header) == 26 and header[12:16] == b'IHDR':
+            width, height = struct.unpack('>II', header[16:24])
+            with Image.open(image_path) as img:
+                mode = img.mode
+            return ImageInfo(header[24] if header[24] > 8 else 8, mode, (width, height))
+
+    if ext in HEIF_EXTENSIONS:
+        ensure_heif_opener()
+
+    # Image.open只解析头部，不调用load()就不会解码像素
+    with Image.open(image_path) as img:
+        bit_depth = _MODE_BIT_DEPTHS.get(img.mode, 8)
+        if hasattr(img, 'tag_v2'):
+            # TIFF的BitsPerSample标签
+            bits = img.tag_v2.get(258)
+            if bits:
+                bit_depth = max(bits) if isinstance(bits, tuple) else bits
+        elif img.info.get('bit_depth'):
+            # pillow_heif提供的HEIF/AVIF位深
+            bit_depth = img.info['bit_depth']
+        return ImageInfo(max(int(bit_depth), 8), img.mode, img.size)
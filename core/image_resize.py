@@ -0,0 +1,50 @@
+"""
+输出尺寸计算模块
+缩放参数为元组：
+    ('long_edge', n)  长边缩放到n像素
+    ('box', w, h)     缩放到能放入 w×h 的最大尺寸，保持宽高比
+    ('scale', f)      按比例f缩放
+长边和限定框方式只缩小不放大
+"""
+
+
+def scale_factor(size, resize):
+    """
+    计算缩放比例
+
+    Args:
+        size: 原始尺寸 (宽, 高)
+        resize: 缩放参数
+
+    Returns:
+        float: 缩放比例
+    """
+    kind, *values = resize
+    if not values or any(v <= 0 for v in values):
+        raise ValueError(f"无效的缩放参数: {resize}")
+    width, height = size
+    if kind == 'long_edge':
+        return min(values[0] / max(width, height), 1.0)
+    if kind == 'box':
+        return min(values[0] / width, values[1] / height, 1.0)
+    if kind == 'scale':
+        return values[0]
+    raise ValueError(f"未知的缩放方式: {kind}")
+
+
+def target_size(size, resize):
+    """
+    计算输出尺寸
+
+    Args:
+        size: 原始尺寸 (宽, 高)
+        resize: 缩放参数，为None时不缩放
+
+    Returns:
+        tuple or None: 输出尺寸 (宽, 高)，不需要缩放时返回None
+    """
+    if not resize:
+        return None
+    factor = scale_factor(size, resize)
+    target = (max(1, round(size[0] * factor)), max(1, round(size[1] * factor)))
+    return None if target == tuple(size) else target
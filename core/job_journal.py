@@ -0,0 +1,156 @@
+"""
+转换任务日志模块
+在输出目录中以追加方式逐行记录已完成的文件，作为 源文件（路径、大小、修改时间、可选内容哈希）+ 转换参数 -> 输出文件 的清单。
+任务中断后重新运行时，源文件、输出文件和转换参数都未变化的文件直接跳过；
+增量模式下源文件或参数已变化的输出文件视为过期，重新转换覆盖
+"""
+import hashlib
+import json
+import os
+
+# 日志文件名，位于输出目录中
+JOURNAL_NAME = '.image_convert_journal.jsonl'
+
+# 文件状态
+UNCHANGED = 'unchanged'  # 已按相同参数转换，源文件和输出文件都未变化
+STALE = 'stale'          # 输出文件由该源文件生成且未被改动，但源文件或转换参数已变化
+NEW = 'new'              # 没有可用的记录
+
+
+def file_digest(path):
+    """
+    计算文件内容的SHA-256哈希
+
+    Returns:
+        str: 十六进制哈希值
+    """
+    with open(path, 'rb') as f:
+        return hashlib.file_digest(f, 'sha256').hexdigest()
+
+
+class JobJournal:
+    """追加写入的转换任务日志"""
+
+    def __init__(self, output_dir):
+        """
+        加载输出目录中的任务日志
+
+        Args:
+            output_dir: 输出目录
+        """
+        self.path = os.path.join(output_dir, JOURNAL_NAME)
+        self._entries = {}  # 规范化输出路径 -> 记录，后写入的记录覆盖先前的，即磁盘上输出文件的来源
+        self._file = None
+        try:
+            # 程序中断时最后一行可能断在多字节字符中间，解码错误替换为占位符，该行随后因JSON不完整被跳过
+            with open(self.path, encoding='utf-8', errors='replace') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        self._entries[os.path.normcase(entry['output'])] = entry
+                    except (ValueError, KeyError):
+                        # 程序崩溃时最后一行可能不完整
+                        continue
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def make_params(output_format, quality, bit_depth, resize=None):
+        """
+        生成转换参数的规范化字符串，参数不同的记录互不影响
+
+        Returns:
+            str: 参数字符串
+        """
+        return json.dumps([output_format, quality, bit_depth, list(resize) if resize else None])
+
+    def check(self, input_path, output_path, params, verify_hash=False):
+        """
+        只通过stat判断文件状态
+
+        Args:
+            input_path: 源文件路径
+            output_path: 输出文件路径
+            params: make_params生成的参数字符串
+            verify_hash: 源文件大小相同但修改时间变化时，比较内容哈希（记录中有哈希时）
+
+        Returns:
+            str: UNCHANGED、STALE或NEW
+        """
+        entry = self._entries.get(os.path.normcase(output_path))
+        if entry is None or os.path.normcase(entry['input']) != os.path.normcase(input_path):
+            return NEW
+        try:
+            source = os.stat(input_path)
+            output = os.stat(output_path)
+        except OSError:
+            return NEW
+        if (entry['output_size'], entry['output_mtime_ns']) != (output.st_size, output.st_mtime_ns):
+            # 输出文件已被其他程序修改，不再属于本程序
+            return NEW
+        if entry['params'] != params:
+            return STALE
+        if (entry['size'], entry['mtime_ns']) == (source.st_size, source.st_mtime_ns):
+            return UNCHANGED
+        if verify_hash and entry.get('sha256') and entry['size'] == source.st_size and file_digest(input_path) == entry['sha256']:
+            # 内容未变（如复制或touch后修改时间变化），更新记录，下次只需stat
+            self._append(dict(entry, mtime_ns=source.st_mtime_ns))
+            return UNCHANGED
+        return STALE
+
+    def is_completed(self, input_path, output_path, params):
+        """
+        判断文件是否已按相同参数转换完成，且源文件和输出文件都未被修改
+
+        Returns:
+            bool: 是否可以跳过
+        """
+        return self.check(input_path, output_path, params) == UNCHANGED
+
+    def record(self, input_path, output_path, params, hash_source=False):
+        """
+        记录一个已完成的文件，每条记录立即写入磁盘
+
+        Args:
+            input_path: 源文件路径
+            output_path: 输出文件路径
+            params: make_params生成的参数字符串
+            hash_source: 是否同时记录源文件的内容哈希
+        """
+        source = os.stat(input_path)
+        output = os.stat(output_path)
+        entry = {
+            'input': input_path,
+            'output': output_path,
+            'params': params,
+            'size': source.st_size,
+            'mtime_ns': source.st_mtime_ns,
+            'output_size': output.st_size,
+            'output_mtime_ns': output.st_mtime_ns,
+        }
+        if hash_source:
+            entry['sha256'] = file_digest(input_path)
+        self._append(entry)
+
+    def _append(self, entry):
+        """追加一条记录"""
+        if self._file is None:
+            # 行缓冲，每条记录写完即落盘，中断时最多丢失当前一行
+            self._file = open(self.path, 'a', encoding='utf-8', buffering=1)
+            if self._file.tell() > 0 and not self._ends_with_newline():
+                # 上次中断留下的不完整行单独成行，不与新记录拼接
+                self._file.write('\n')
+        self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self._entries[os.path.normcase(entry['output'])] = entry
+
+    def _ends_with_newline(self):
+        """日志文件是否以换行符结尾"""
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+
+    def close(self):
+        """关闭日志文件"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,112 @@
+"""
+SQLite LRU索引模块
+在SQLite表中记录 键 -> 大小、访问序号，按总字节数进行LRU淘汰，结果缓存和缩略图存储共用
+"""
+
+
+class LruIndex:
+    """
+    按总字节数限制的LRU索引
+    访问顺序用单调递增的序号记录，不依赖系统时间的精度和调整；
+    本身不加锁，由使用它的存储在自己的锁内调用
+    """
+
+    def __init__(self, conn, table, max_bytes, columns=()):
+        """
+        在数据库中建立索引表
+
+        Args:
+            conn: SQLite连接（isolation_level=None，每条语句自动提交）
+            table: 表名，包含key、size、last_access列
+            max_bytes: 总字节数上限，超出后淘汰最久未访问的条目
+            columns: 存储自身需要的其他列定义，如 ('data BLOB NOT NULL',)
+        """
+        self._conn = conn
+        self._table = table
+        self.max_bytes = max_bytes
+        conn.execute(
+            f'CREATE TABLE IF NOT EXISTS {table} ('
+            + ', '.join(['key TEXT PRIMARY KEY', 'size INTEGER NOT NULL', 'last_access INTEGER NOT NULL', *columns])
+            + ')'
+        )
+        conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_last_access ON {table}(last_access)')
+        # 旧版本结果缓存和缩略图存储各自建立的同名索引，已被上面按表名建立的索引取代
+        conn.execute('DROP INDEX IF EXISTS idx_last_access')
+        self.total_bytes, last = conn.execute(
+            f'SELECT COALESCE(SUM(size), 0), COALESCE(MAX(last_access), 0) FROM {table}'
+        ).fetchone()
+        # 旧版本以time.time()记录访问时间，从最大值继续递增即可保持顺序
+        self._counter = int(last)
+
+    def size_of(self, key):
+        """
+        获取条目大小
+
+        Returns:
+            int or None: 字节数，不存在时返回None
+        """
+        row = self._conn.execute(f'SELECT size FROM {self._table} WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def touch(self, key):
+        """将条目标记为最近访问"""
+        self._conn.execute(f'UPDATE {self._table} SET last_access = ? WHERE key = ?', (self._next(), key))
+
+    def put(self, key, size, **values):
+        """
+        写入或替换条目，总大小超出上限时从最久未访问的条目开始逐条淘汰，降到上限的90%即停止；
+        刚写入的条目不会被淘汰
+
+        Args:
+            key: 键
+            size: 字节数
+            values: 其他列的值
+
+        Returns:
+            list: 被淘汰的键，存储需要自行删除对应的数据
+        """
+        old_size = self.size_of(key)
+        if old_size is not None:
+            self.total_bytes -= old_size
+        names = ['key', 'size', 'last_access', *values]
+        self._conn.execute(
+            f'INSERT OR REPLACE INTO {self._table} ({", ".join(names)}) VALUES ({", ".join("?" * len(names))})',
+            (key, size, self._next(), *values.values())
+        )
+        self.total_bytes += size
+        if self.total_bytes <= self.max_bytes:
+            return []
+        return self._evict(keep=key)
+
+    def remove(self, key):
+        """删除条目"""
+        size = self.size_of(key)
+        if size is not None:
+            self._conn.execute(f'DELETE FROM {self._table} WHERE key = ?', (key,))
+            self.total_bytes -= size
+
+    def clear(self):
+        """删除所有条目"""
+        self._conn.execute(f'DELETE FROM {self._table}')
+        self.total_bytes = 0
+
+    def _next(self):
+        """下一个访问序号"""
+        self._counter += 1
+        return self._counter
+
+    def _evict(self, keep):
+        """淘汰最久未访问的条目直到总大小不超过上限的90%，返回被淘汰的键"""
+        target = self.max_bytes * 0.9
+        rows = self._conn.execute(
+            f'SELECT key, size FROM {self._table} WHERE key != ? ORDER BY last_access', (keep,)
+        )
+        evicted = []
+        for key, size in rows:
+            if self.total_bytes <= target:
+                break
+            evicted.append(key)
+            self.total_bytes -= size
+        rows.close()
+        self._conn.executemany(f'DELETE FROM {self._table} WHERE key = ?', [(key,) for key in evicted])
+        return evicted
@@ -0,0 +1,80 @@
+"""
+转换内存预算模块
+根据文件头中的尺寸和位深估算单个转换任务的峰值工作集，
+并行转换时只在进行中任务的估算总和不超过预算时才提交新任务
+"""
+import os
+
+from .image_probe import probe_image, RAW_EXTENSIONS
+from .image_resize import target_size
+
+# 无法探测尺寸时的保守估算
+DEFAULT_WORKING_SET = 256 * 1024 * 1024
+
+# 工作进程中解码库、编码器等与图像大小无关的常驻内存
+BASE_OVERHEAD = 96 * 1024 * 1024
+
+# x265/aom编码器每个输出像素的内存占用（实测24MP约650MB）
+HEIF_ENCODER_BYTES_PER_PIXEL = 28
+
+# 各模式的通道数，未列出的按3通道计算
+_MODE_CHANNELS = {'1': 1, 'L': 1, 'P': 1, 'I': 4, 'F': 4, 'I;16': 2, 'LA': 2, 'RGBA': 4, 'CMYK': 4}
+
+_SIZE_UNITS = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+
+
+def parse_size(text):
+    """
+    解析带单位的内存大小
+
+    Args:
+        text: 如 "24G"、"512M"、"1073741824"
+
+    Returns:
+        int: 字节数
+    """
+    text = text.strip().upper().rstrip('B')
+    if text and text[-1] in _SIZE_UNITS:
+        return int(float(text[:-1]) * _SIZE_UNITS[text[-1]])
+    return int(text)
+
+
+def estimate_working_set(image_path, output_format, bit_depth, resize=None):
+    """
+    估算转换单个文件的峰值工作集
+
+    RAW: 传感器数据(2字节/像素) + LibRaw的4通道16位工作缓冲 + 去马赛克输出，半尺寸解码时后两者为1/4；
+    其他格式: 解码后的图像；
+    两者再加上编码：HEIF/AVIF编码器约28字节/输出像素，其余格式按输出图像的两份副本计算
+
+    Args:
+        image_path: 输入文件路径
+        output_format: 输出格式，为None时保持原格式
+        bit_depth: 输出位深，为None时保持原位深
+        resize: 缩放参数
+
+    Returns:
+        int: 估算字节数
+    """
+    try:
+        info = probe_image(image_path)
+    except Exception:
+        return DEFAULT_WORKING_SET
+    width, height = info.size
+    pixels = width * height
+    target = target_size(info.size, resize) or info.size
+    output_pixels = target[0] * target[1]
+    # 请求的位深高于原位深时转换服务会改为8位
+    output_depth = info.bit_depth if bit_depth is None else (bit_depth if bit_depth <= info.bit_depth else 8)
+    output_bytes = 2 if output_depth > 8 else 1
+
+    if os.path.splitext(image_path)[1].lower() in RAW_EXTENSIONS:
+        half_size = target[0] * 2 <= width and target[1] * 2 <= height
+        decode = pixels * 2 + pixels * (8 + 3 * output_bytes) // (4 if half_size else 1)
+    else:
+        decode = pixels * _MODE_CHANNELS.get(info.mode, 3) * (2 if info.bit_depth > 8 else 1)
+    if output_format in ('HEIC', 'HEIF', 'AVIF'):
+        encode = output_pixels * HEIF_ENCODER_BYTES_PER_PIXEL
+    else:
+        encode = output_pixels * 3 * output_bytes * 2
+    return BASE_OVERHEAD + decode + encode
@@ -0,0 +1,159 @@
+"""
+转换进度汇总模块
+接收每个文件的结果记录，统计吞吐量（张/秒、读写MB/秒）和按滑动平均速率估算的剩余时间，
+并把回调频率限制在每秒若干次，界面和命令行共用
+"""
+import os
+import threading
+import time
+from collections import namedtuple
+
+# 进度快照：已完成数、总数、最近完成的文件、已用时间（秒）、张/秒、读取字节/秒、写入字节/秒、剩余时间（秒，未知时为None）
+ProgressSnapshot = namedtuple('ProgressSnapshot', [
+    'done', 'total', 'current', 'elapsed', 'images_per_sec', 'read_bytes_per_sec', 'write_bytes_per_sec', 'eta'
+])
+
+# 不需要实际处理、瞬间完成的记录，不计入速率
+_INSTANT_STATUSES = {'resumed', 'skipped'}
+
+
+class ProgressAggregator:
+    """限频的转换进度汇总器"""
+
+    def __init__(self, total, callback, interval=0.1, smoothing=0.3):
+        """
+        Args:
+            total: 文件总数
+            callback: 进度回调函数，参数为ProgressSnapshot，可能在工作线程或定时器线程中调用
+            interval: 两次回调的最小间隔（秒），默认0.1即最多10次/秒
+            smoothing: 速率滑动平均的权重，越大越偏向最近的速率
+        """
+        self.total = total
+        self.callback = callback
+        self.interval = interval
+        self.smoothing = smoothing
+        self.done = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.current = ''
+        self._worked = 0  # 实际处理的文件数
+        self._start = time.monotonic()
+        self._last_emit = None
+        self._sample_time = self._start
+        self._sample_worked = 0
+        self._rate = None  # 滑动平均速率（张/秒）
+        self._lock = threading.Lock()
+        self._timer = None
+        self._closed = False
+
+    def update(self, record):
+        """
+        记录一个文件的处理结果，可直接作为ConversionService的result_callback
+
+        距上次回调不足interval时不立即回调，而是在间隔到达时补发最新进度，最后的状态不会丢失
+
+        Args:
+            record: 结果记录
+        """
+        snapshot = None
+        with self._lock:
+            self.done += 1
+            self.bytes_read += record.get('bytes_read', 0)
+            self.bytes_written += record.get('bytes_written', 0)
+            self.current = record['input']
+            if record['status'] not in _INSTANT_STATUSES:
+                self._worked += 1
+            now = time.monotonic()
+            if self.done >= self.total or self._last_emit is None or now - self._last_emit >= self.interval:
+                snapshot = self._emit(now)
+            elif self._timer is None:
+                self._timer = threading.Timer(self._last_emit + self.interval - now, self._flush)
+                self._timer.daemon = True
+                self._timer.start()
+        # 释放锁后再回调，回调中可以调用snapshot()或update()
+        if snapshot is not None:
+            self.callback(snapshot)
+
+    def snapshot(self):
+        """
+        获取当前进度
+
+        Returns:
+            ProgressSnapshot: 进度快照
+        """
+        with self._lock:
+            return self._snapshot(time.monotonic())
+
+    def close(self):
+        """取消尚未触发的补发，之后不再回调"""
+        with self._lock:
+            self._closed = True
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def _flush(self):
+        """定时器到期，补发最新进度"""
+        with self._lock:
+            self._timer = None
+            if self._closed:
+                return
+            snapshot = self._emit(time.monotonic())
+        self.callback(snapshot)
+
+    def _emit(self, now):
+        """
+        更新滑动平均速率，生成要回调的快照（调用时已持有锁，由调用方释放锁后回调）
+
+        Returns:
+            ProgressSnapshot: 进度快照
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        elapsed = now - self._sample_time
+        if elapsed > 0 and self._worked > self._sample_worked:
+            rate = (self._worked - self._sample_worked) / elapsed
+            self._rate = rate if self._rate is None else self.smoothing * rate + (1 - self.smoothing) * self._rate
+            self._sample_time = now
+            self._sample_worked = self._worked
+        self._last_emit = now
+        return self._snapshot(now)
+
+    def _snapshot(self, now):
+        """生成进度快照"""
+        elapsed = now - self._start
+        remaining = self.total - self.done
+        if remaining <= 0:
+            eta = 0.0
+        elif self._rate:
+            eta = remaining / self._rate
+        else:
+            eta = None
+        return ProgressSnapshot(
+            self.done,
+            self.total,
+            self.current,
+            elapsed,
+            self._worked / elapsed if elapsed > 0 else 0.0,
+            self.bytes_read / elapsed if elapsed > 0 else 0.0,
+            self.bytes_written / elapsed if elapsed > 0 else 0.0,
+            eta
+        )
+
+
+def format_progress(snapshot):
+    """
+    将进度快照格式化为单行文本，用于状态栏和命令行显示
+
+    Returns:
+        str: 如 "正在转换 (12/300) 3.2 张/s | 读 45.1MB/s 写 8.2MB/s | 剩余 1:32 | IMG_0012.CR3"
+    """
+    if snapshot.eta is None:
+        eta = '--:--'
+    else:
+        minutes, seconds = divmod(int(snapshot.eta + 0.5), 60)
+        eta = f"{minutes // 60}:{minutes % 60:02d}:{seconds:02d}" if minutes >= 60 else f"{minutes}:{seconds:02d}"
+    return (f"正在转换 ({snapshot.done}/{snapshot.total}) {snapshot.images_per_sec:.1f} 张/s | "
+            f"读 {snapshot.read_bytes_per_sec / 1e6:.1f}MB/s 写 {snapshot.write_bytes_per_sec / 1e6:.1f}MB/s | "
+            f"剩余 {eta} | {os.path.basename(snapshot.current) or '开始转换...'}")
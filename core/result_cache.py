@@ -0,0 +1,205 @@
+"""
+转换结果缓存
+以 源文件内容哈希 + 转换参数 为键保存编码后的输出文件，按总字节数进行LRU淘汰；
+缓存对象是独立的只读副本，命中时复制（可选硬链接）生成输出，不再解码和编码
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+from stat import S_IREAD, S_IRGRP, S_IROTH, S_IWRITE
+
+from .file_ops import atomic_output, copy_data
+from .job_journal import file_digest
+from .lru_index import LruIndex
+
+# 转换流程变化导致相同参数的输出不同时递增，旧缓存自然失效
+CACHE_VERSION = 1
+
+
+def copy_or_link(source, destination, hardlink=False):
+    """
+    生成文件，默认复制（支持时为reflink，数据块写时复制，修改任一文件都不会影响另一个）；
+    先写入临时文件再替换，目标位置不会出现不完整的文件
+
+    Args:
+        source: 源文件路径
+        destination: 目标文件路径
+        hardlink: 优先使用硬链接，两个路径共享同一份数据，不支持时复制
+    """
+    with atomic_output(destination) as temp:
+        if hardlink:
+            try:
+                os.link(source, temp)
+                return
+            except OSError:
+                pass
+        copy_data(source, temp)
+
+
+class ResultCache:
+    """按内容寻址的转换结果缓存"""
+
+    def __init__(self, cache_dir, max_bytes=10 * 1024 * 1024 * 1024, hardlink=False):
+        """
+        初始化结果缓存
+
+        Args:
+            cache_dir: 缓存目录，输出文件保存在objects子目录，索引保存在index.db
+            max_bytes: 缓存总字节数上限，超出后淘汰最久未使用的结果
+            hardlink: 命中时用硬链接生成输出，节省空间；输出与缓存对象共享数据，因此同样是只读的
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hardlink = hardlink
+        # 可能在界面线程创建、在转换线程使用
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.join(cache_dir, 'objects'), exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(cache_dir, 'index.db'), check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._index = LruIndex(self._conn, 'results', max_bytes)
+        # 源文件哈希按 路径+大小+修改时间 记忆，未修改的源文件再次运行时无需重新读取
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS sources ('
+            'path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, sha256 TEXT NOT NULL)'
+        )
+
+    @staticmethod
+    def make_key(source_hash, params, output_ext):
+        """
+        生成缓存键
+
+        Args:
+            source_hash: 源文件内容哈希
+            params: 转换参数字符串（格式、质量、位深、缩放）
+            output_ext: 输出文件扩展名
+
+        Returns:
+            str: 缓存键
+        """
+        return hashlib.sha256(f"{CACHE_VERSION}|{source_hash}|{params}|{output_ext.lower()}".encode()).hexdigest()
+
+    def source_hashes(self, paths, threads=4):
+        """
+        获取一批源文件的内容哈希，未记忆的文件在线程池中并行计算
+
+        Args:
+            paths: 源文件路径列表
+            threads: 计算哈希的线程数
+
+        Returns:
+            dict: 路径 -> 哈希，无法读取的文件为None
+        """
+        hashes = {}
+        missing = []
+        with self._lock:
+            for path in paths:
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    hashes[path] = None
+                    continue
+                row = self._conn.execute(
+                    'SELECT sha256 FROM sources WHERE path = ? AND size = ? AND mtime_ns = ?',
+                    (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+                ).fetchone()
+                if row:
+                    hashes[path] = row[0]
+                else:
+                    missing.append((path, stat))
+        if not missing:
+            return hashes
+
+        # hashlib处理大块数据时释放GIL，线程即可并行读取和计算
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            digests = list(executor.map(self._safe_digest, [path for path, _ in missing]))
+        with self._lock:
+            for (path, stat), digest in zip(missing, digests):
+                hashes[path] = digest
+                if digest:
+                    self._conn.execute(
+                        'INSERT OR REPLACE INTO sources (path, size, mtime_ns, sha256) VALUES (?, ?, ?, ?)',
+                        (os.path.abspath(path), stat.st_size, stat.st_mtime_ns, digest)
+                    )
+        return hashes
+
+    @staticmethod
+    def _safe_digest(path):
+        """计算文件哈希，读取失败时返回None"""
+        try:
+            return file_digest(path)
+        except OSError:
+            return None
+
+    def get(self, key, output_path):
+        """
+        缓存命中时生成输出文件
+
+        Args:
+            key: 缓存键
+            output_path: 输出文件路径
+
+        Returns:
+            bool: 是否命中
+        """
+        with self._lock:
+            size = self._index.size_of(key)
+            if size is None:
+                return False
+            object_path = self._object_path(key)
+            try:
+                if os.path.getsize(object_path) != size:
+                    raise OSError(f"缓存文件大小不一致: {object_path}")
+                copy_or_link(object_path, output_path, self.hardlink)
+            except OSError:
+                # 缓存文件被外部删除或修改，丢弃该记录
+                self._index.remove(key)
+                return False
+            self._index.touch(key)
+            return True
+
+    def put(self, key, output_path):
+        """
+        保存转换结果，必要时淘汰旧缓存
+
+        Args:
+            key: 缓存键
+            output_path: 已生成的输出文件路径
+        """
+        size = os.path.getsize(output_path)
+        if size > self.max_bytes:
+            return
+        object_path = self._object_path(key)
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        # 保存独立的只读副本，之后修改输出文件不会改变缓存
+        self._remove_object(key)
+        copy_or_link(output_path, object_path)
+        os.chmod(object_path, S_IREAD | S_IRGRP | S_IROTH)
+        with self._lock:
+            for evicted in self._index.put(key, size):
+                self._remove_object(evicted)
+
+    def _object_path(self, key):
+        """缓存键对应的文件路径，按前两位分子目录"""
+        return os.path.join(self.cache_dir, 'objects', key[:2], key)
+
+    def _remove_object(self, key):
+        """删除缓存对象文件，Windows上需先去掉只读属性"""
+        object_path = self._object_path(key)
+        try:
+            os.chmod(object_path, S_IREAD | S_IWRITE)
+            os.remove(object_path)
+        except OSError:
+            pass
+
+    def get_total_bytes(self):
+        """获取当前缓存占用的字节数"""
+        return self._index.total_bytes
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
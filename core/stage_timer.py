@@ -0,0 +1,117 @@
+"""
+分阶段计时模块
+记录单个文件在探测、解码、去马赛克、缩放、元数据、编码写入等阶段的耗时和读写字节数，
+并可将一批文件的记录汇总或导出为CSV/JSON报告
+每个阶段开始前同时检查取消请求，长时间的RAW处理可以在阶段之间停止
+"""
+import csv
+import json
+import time
+from contextlib import contextmanager
+
+# 报告中阶段的排列顺序
+STAGES = ('probe', 'decode', 'demosaic', 'resize', 'metadata', 'encode+write', 'copy', 'cache')
+
+
+class ConversionCancelled(Exception):
+    """转换已被取消"""
+
+
+class StageTimer:
+    """单个文件的分阶段计时器"""
+
+    def __init__(self, cancel_event=None):
+        """
+        Args:
+            cancel_event: 取消事件（threading.Event或multiprocessing.Event），被设置后下一个阶段不再开始
+        """
+        self.cancel_event = cancel_event
+        self.stages = {}  # 阶段名 -> 累计耗时（秒）
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    @contextmanager
+    def stage(self, name):
+        """
+        统计with块的耗时并累加到指定阶段
+
+        Args:
+            name: 阶段名
+
+        Raises:
+            ConversionCancelled: 已请求取消
+        """
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise ConversionCancelled()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+
+def summarize(records):
+    """
+    汇总一批结果记录的各阶段耗时和读写字节数
+
+    Args:
+        records: 结果记录列表（ConversionService的result_callback参数）
+
+    Returns:
+        dict: {'stages': {阶段名: 总耗时}, 'bytes_read': 总读取字节, 'bytes_written': 总写入字节,
+               'peak_rss': 各转换进程峰值内存的最大值}
+    """
+    totals = {}
+    for record in records:
+        for name, seconds in record.get('stages', {}).items():
+            totals[name] = totals.get(name, 0.0) + seconds
+    return {
+        'stages': {name: totals[name] for name in sorted(totals, key=_stage_order)},
+        'bytes_read': sum(r.get('bytes_read', 0) for r in records),
+        'bytes_written': sum(r.get('bytes_written', 0) for r in records),
+        'peak_rss': max((r.get('peak_rss', 0) for r in records), default=0),
+    }
+
+
+def format_summary(summary):
+    """
+    将汇总结果格式化为单行文本，用于状态栏显示
+
+    Returns:
+        str: 如 "decode 1.20s | encode+write 3.40s | 读 120.0MB 写 30.0MB | 峰值内存 850MB"
+    """
+    parts = [f"{name} {seconds:.2f}s" for name, seconds in summary['stages'].items()]
+    parts.append(f"读 {summary['bytes_read'] / 1e6:.1f}MB 写 {summary['bytes_written'] / 1e6:.1f}MB")
+    if summary.get('peak_rss'):
+        parts.append(f"峰值内存 {summary['peak_rss'] / 1024 / 1024:.0f}MB")
+    return " | ".join(parts)
+
+
+def write_report(records, path):
+    """
+    导出分阶段计时报告，按扩展名选择格式：.csv为每个文件一行，其余为JSON
+
+    Args:
+        records: 结果记录列表
+        path: 报告文件路径
+    """
+    if path.lower().endswith('.csv'):
+        stage_names = sorted({name for r in records for name in r.get('stages', {})}, key=_stage_order)
+        with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.writer(f)
+            writer.writerow(['input', 'output', 'status', 'seconds', 'bytes_read', 'bytes_written', 'peak_rss'] + stage_names + ['error'])
+            for r in records:
+                stages = r.get('stages', {})
+                writer.writerow(
+                    [r['input'], r['output'], r['status'], f"{r['seconds']:.4f}", r.get('bytes_read', 0), r.get('bytes_written', 0), r.get('peak_rss', 0)]
+                    + [f"{stages[name]:.4f}" if name in stages else '' for name in stage_names]
+                    + [r['error'] or '']
+                )
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'summary': summarize(records), 'files': records}, f, ensure_ascii=False, indent=2)
+
+
+def _stage_order(name):
+    """阶段排序键，未知阶段排在最后"""
+    return STAGES.index(name) if name in STAGES else len(STAGES)
@@ -0,0 +1,55 @@
+"""
+启动耗时分析模块
+包装内置__import__，统计每个模块首次导入的自身耗时（不含其导入的其他模块），用于 --profile-startup
+"""
+import builtins
+import importlib.util
+import sys
+import time
+
+_start = None
+_records = {}  # 模块名 -> 自身导入耗时（秒）
+_stack = []  # 每层正在导入的模块中，子模块导入耗时的累加
+
+
+def install():
+    """安装导入计时钩子，需要在导入其他模块之前调用"""
+    global _start
+    _start = time.perf_counter()
+    original_import = builtins.__import__
+
+    def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+        full_name = name
+        if level:
+            full_name = importlib.util.resolve_name('.' * level + name, (globals or {}).get('__package__'))
+        if full_name in sys.modules:
+            return original_import(name, globals, locals, fromlist, level)
+
+        _stack.append(0.0)
+        begin = time.perf_counter()
+        try:
+            return original_import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - begin
+            children = _stack.pop()
+            _records[full_name] = _records.get(full_name, 0.0) + elapsed - children
+            if _stack:
+                _stack[-1] += elapsed
+
+    builtins.__import__ = timed_import
+
+
+def report(top=25, file=None):
+    """
+    输出导入耗时统计
+
+    Args:
+        top: 输出耗时最长的模块数量
+        file: 输出目标，默认为stderr
+    """
+    file = file or sys.stderr
+    total_import = sum(_records.values())
+    print(f"启动耗时: {(time.perf_counter() - _start) * 1000:.1f} ms，其中模块导入: {total_import * 1000:.1f} ms", file=file)
+    print(f"{'自身耗时(ms)':>12}  模块", file=file)
+    for name, seconds in sorted(_records.items(), key=lambda item: item[1], reverse=True)[:top]:
+        print(f"{seconds * 1000:>12.1f}  {name}", file=file)
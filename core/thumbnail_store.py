@@ -0,0 +1,87 @@
+"""
+持久化缩略图存储
+使用单个SQLite文件保存编码后的缩略图，按总字节数进行LRU淘汰
+"""
+import os
+import sqlite3
+import threading
+
+from .lru_index import LruIndex
+
+
+class ThumbnailStore:
+    """磁盘缩略图缓存"""
+    
+    def __init__(self, db_path, max_bytes=256 * 1024 * 1024):
+        """
+        初始化缩略图存储
+        
+        Args:
+            db_path: SQLite数据库文件路径
+            max_bytes: 缓存总字节数上限，超出后淘汰最久未访问的缩略图
+        """
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        # 缩略图在线程池中读写，所有数据库操作串行执行
+        self._lock = threading.Lock()
+        
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._index = LruIndex(self._conn, 'thumbnails', max_bytes, ('data BLOB NOT NULL',))
+    
+    @staticmethod
+    def make_key(file_path, file_size, mtime_ns, thumbnail_size):
+        """
+        生成缓存键，源文件大小或修改时间变化后旧缓存自然失效
+        
+        Args:
+            file_path: 源文件路径
+            file_size: 源文件大小
+            mtime_ns: 源文件修改时间（纳秒）
+            thumbnail_size: 缩略图尺寸 (宽, 高)
+        
+        Returns:
+            str: 缓存键
+        """
+        return f"{file_path}|{file_size}|{mtime_ns}|{thumbnail_size[0]}x{thumbnail_size[1]}"
+    
+    def get(self, key):
+        """
+        读取缩略图
+        
+        Returns:
+            bytes or None: 编码后的缩略图数据
+        """
+        with self._lock:
+            row = self._conn.execute('SELECT data FROM thumbnails WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            self._index.touch(key)
+            return bytes(row[0])
+    
+    def put(self, key, data):
+        """
+        写入缩略图，必要时淘汰最久未访问的缩略图
+        
+        Args:
+            key: 缓存键
+            data: 编码后的缩略图数据
+        """
+        with self._lock:
+            self._index.put(key, len(data), data=sqlite3.Binary(data))
+    
+    def get_total_bytes(self):
+        """获取当前缓存占用的字节数"""
+        return self._index.total_bytes
+    
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._index.clear()
+    
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
@@ -1,9 +1,18 @@
 """
 工具函数模块
+Qt相关的函数在调用时才导入PySide6，其余函数可在无界面环境中使用
 """
 import os
+import sys
 from pathlib import Path
-from PySide6.QtWidgets import QMessageBox
+
+# 导入文件夹时识别的图片扩展名（包括RAW格式），统一小写
+IMAGE_INPUT_EXTENSIONS = frozenset({
+    '.png', '.jpg', '.jpeg', '.bmp', '.tiff', '.tif', '.webp',
+    '.heic', '.heif', '.avif', '.gif', '.jp2', '.j2k',
+    '.cr2', '.cr3', '.nef', '.nrw', '.arw', '.dng',
+    '.orf', '.rw2', '.pef', '.raf', '.raw'
+})
 
 
 def get_image_files(directory):
@@ -28,6 +37,79 @@ def get_image_files(directory):
     return [str(f) for f in unique_files]
 
 
+def iter_image_files(directory, extensions=IMAGE_INPUT_EXTENSIONS, is_cancelled=None, recursive=True):
+    """
+    单次遍历目录树，逐个产出图片文件
+    
+    Args:
+        directory: 根目录
+        extensions: 小写扩展名集合，匹配时忽略大小写
+        is_cancelled: 可选的取消检查函数，返回True时停止遍历
+        recursive: 是否遍历子目录
+        
+    Yields:
+        str: 图片文件路径
+    """
+    stack = [directory]
+    while stack:
+        if is_cancelled and is_cancelled():
+            return
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError as e:
+            print(f"无法读取目录 {current}: {e}")
+            continue
+        
+        subdirs = []
+        for entry in entries:
+            try:
+                # 不跟随符号链接，避免目录循环
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive:
+                        subdirs.append(entry.path)
+                elif os.path.splitext(entry.name)[1].lower() in extensions and entry.is_file():
+                    yield entry.path
+            except OSError:
+                continue
+        # 逆序入栈，保持子目录按名称顺序遍历
+        stack.extend(reversed(subdirs))
+
+
+def peak_rss_bytes():
+    """
+    获取当前进程的峰值常驻内存
+    
+    Returns:
+        int: 峰值内存字节数，无法获取时返回0
+    """
+    if sys.platform == 'win32':
+        import ctypes
+        from ctypes import wintypes
+        
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD)] + [
+                (name, ctypes.c_size_t) for name in (
+                    'PeakWorkingSetSize', 'WorkingSetSize', 'QuotaPeakPagedPoolUsage', 'QuotaPagedPoolUsage',
+                    'QuotaPeakNonPagedPoolUsage', 'QuotaNonPagedPoolUsage', 'PagefileUsage', 'PeakPagefileUsage')
+            ]
+        
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        psapi = ctypes.WinDLL('psapi')
+        psapi.GetProcessMemoryInfo.argtypes = [wintypes.HANDLE, ctypes.POINTER(PROCESS_MEMORY_COUNTERS), wintypes.DWORD]
+        handle = ctypes.windll.kernel32.GetCurrentProcess()
+        if psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+            return counters.PeakWorkingSetSize
+        return 0
+    
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux单位为KB，macOS单位为字节
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
 def show_message(parent, title, message, icon=None, non_blocking=False):
     """
     显示消息对话框
@@ -39,6 +121,9 @@ def show_message(parent, title, message, icon=None, non_blocking=False):
         icon: 图标
         non_blocking: 是否使用非阻塞模式（推荐在批量处理中使用）
     """
+    # 延迟导入Qt，命令行模式下不依赖PySide6
+    from PySide6.QtWidgets import QMessageBox
+    
     msg_box = QMessageBox(parent)
     msg_box.setWindowTitle(title)
     msg_box.setText(message)
@@ -72,6 +157,8 @@ def show_question(parent, title, message):
     Returns:
         bool: 用户是否点击了"是"
     """
+    from PySide6.QtWidgets import QMessageBox
+    
     reply = QMessageBox.question(
         parent, title, message,
         QMessageBox.Yes | QMessageBox.No,
@@ -2,18 +2,118 @@
 主程序入口
 """
 import sys
+
+if '--profile-startup' in sys.argv:
+    # 需要在导入其他模块之前安装计时钩子
+    from core.startup_profile import install
+    install()
+
 import os
+import multiprocessing
 from pathlib import Path
 
 from PySide6.QtWidgets import QApplication, QMainWindow, QFileDialog, QMessageBox
-from PySide6.QtCore import Qt, QSettings
+from PySide6.QtCore import Qt, QSettings, QThread, QTimer, Signal
 from PySide6.QtGui import QIcon
 
 from ui_mainwindow import Ui_MainWindow
 from managers.grid_view_manager import GridViewManager
 from services.image_loader_service import ImageLoaderService
+from services.directory_scanner import DirectoryScanThread
 from services.conversion_service import ConversionService
 from core.utils import show_message, show_question
+from core.memory_budget import parse_size
+from core.result_cache import ResultCache
+from core.progress import ProgressAggregator, format_progress
+from core.stage_timer import summarize, format_summary
+
+
+class ConflictScanThread(QThread):
+    """输出目录冲突扫描线程"""
+    progress_signal = Signal(int, int)
+    complete_signal = Signal(object, object)  # 冲突信息, 输出目录索引
+    
+    def __init__(self, conversion_service, image_files, output_dir, format_ext, replace, quality, bit_depth):
+        super().__init__()
+        self.conversion_service = conversion_service
+        self.image_files = image_files
+        self.output_dir = output_dir
+        self.format_ext = format_ext
+        self.replace = replace
+        self.quality = quality
+        self.bit_depth = bit_depth
+        
+    def run(self):
+        # 任务日志中已完成的文件续跑时会直接跳过，不参与冲突检查
+        pending_files = self.conversion_service.filter_completed(
+            self.image_files, self.output_dir, self.format_ext, self.quality, self.bit_depth
+        )
+        # 单次扫描输出目录建立索引，预扫描和转换阶段共用
+        output_index = self.conversion_service.build_output_index(self.output_dir)
+        conflict_info = self.conversion_service._scan_for_conflicts(
+            pending_files,
+            self.output_dir,
+            self.format_ext,
+            self.replace,
+            self.progress_signal.emit,
+            output_index
+        )
+        self.complete_signal.emit(conflict_info, output_index)
+
+
+class ConvertThread(QThread):
+    """图片转换线程"""
+    progress_signal = Signal(object)  # ProgressSnapshot，最多每秒10次
+    complete_signal = Signal(int, int, object)
+    
+    def __init__(self, conversion_service, image_files, output_dir, format_ext, quality, bit_depth, replace, user_decisions, parent_window=None, workers=1, output_index=None, memory_budget=None, result_cache=None):
+        super().__init__()
+        self.conversion_service = conversion_service
+        self.image_files = image_files
+        self.output_dir = output_dir
+        self.format_ext = format_ext
+        self.quality = quality
+        self.bit_depth = bit_depth
+        self.replace = replace
+        self.user_decisions = user_decisions
+        self.parent_window = parent_window
+        self.workers = workers
+        self.output_index = output_index
+        self.memory_budget = memory_budget
+        self.result_cache = result_cache
+        self.records = []  # 每个文件的结果记录，包含分阶段耗时
+        
+    def run(self):
+        # 逐个文件的结果汇总为限频的进度信号，避免大量文件时界面线程忙于刷新状态栏
+        self.progress = ProgressAggregator(len(self.image_files), self.progress_signal.emit)
+        
+        # 立即发送第一个进度信号，显示开始转换
+        if self.image_files:
+            self.progress_signal.emit(self.progress.snapshot())
+            
+        success_count, error_count, conflict_info = self.conversion_service.convert_images(
+            self.image_files,
+            self.output_dir,
+            self.format_ext,
+            self.quality,
+            self.bit_depth,  # 传递位深参数
+            self.replace,
+            None,
+            self.parent_window,
+            self.user_decisions,  # 传递用户决策
+            workers=self.workers,
+            output_index=self.output_index,
+            result_callback=self._on_result,
+            memory_budget=self.memory_budget,
+            result_cache=self.result_cache
+        )
+        self.progress.close()
+        self.complete_signal.emit(success_count, error_count, conflict_info)
+    
+    def _on_result(self, record):
+        """保存单个文件的结果记录并更新进度"""
+        self.records.append(record)
+        self.progress.update(record)
 
 
 class MainWindow(QMainWindow):
@@ -32,6 +132,9 @@ class MainWindow(QMainWindow):
         
         # 初始化变量
         self.bit_depth = None
+        self.scan_dir_thread = None
+        self.convert_thread = None
+        self.result_cache = None
         
         # 连接信号和槽
         self._connect_signals()
@@ -75,28 +178,40 @@ class MainWindow(QMainWindow):
                 self._update_selected_count()
             
     def _select_directories(self):
-        """选择图片目录"""
+        """选择图片目录，在后台线程中单次遍历并分批加入网格视图"""
         directory = QFileDialog.getExistingDirectory(self, "选择目录")
-        if directory:
-            # 定义支持的图片扩展名（包括RAW格式）
-            image_extensions = [
-                '*.png', '*.jpg', '*.jpeg', '*.bmp', '*.tiff', '*.tif', '*.webp', 
-                '*.heic', '*.heif', '*.avif', '*.gif', '*.jp2', '*.j2k',
-                '*.cr2', '*.cr3', '*.nef', '*.nrw', '*.arw', '*.dng', 
-                '*.orf', '*.rw2', '*.pef', '*.raf', '*.raw'
-            ]
-            image_paths = []
-            for extension in image_extensions:
-                # 使用glob查找文件
-                from pathlib import Path
-                paths = Path(directory).glob(f"**/{extension}")
-                image_paths.extend([str(p) for p in paths])
-                
-            if image_paths:
-                self.grid_view_manager.add_files(image_paths)
-                self._update_selected_count()
-            else:
-                show_message(self, "提示", "所选目录中未找到图片文件")
+        if not directory:
+            return
+        
+        # 取消尚未完成的扫描
+        self._cancel_directory_scan()
+        
+        self.scan_dir_thread = DirectoryScanThread(directory)
+        self.scan_dir_thread.files_found.connect(self._on_directory_files_found)
+        self.scan_dir_thread.finished_scanning.connect(self._on_directory_scan_finished)
+        self.scan_dir_thread.start()
+        self.ui.statusbar.showMessage(f"正在扫描目录: {directory}")
+        
+    def _on_directory_files_found(self, file_paths):
+        """目录扫描发现一批文件"""
+        self.grid_view_manager.add_files(file_paths)
+        self._update_selected_count()
+        self.ui.statusbar.showMessage(f"正在扫描目录: 共 {self.grid_view_manager.get_file_count()} 个文件")
+        
+    def _on_directory_scan_finished(self, total, cancelled):
+        """目录扫描完成"""
+        if cancelled:
+            return
+        self.ui.statusbar.showMessage(f"目录扫描完成: 找到 {total} 个图片文件")
+        if total == 0:
+            show_message(self, "提示", "所选目录中未找到图片文件")
+        
+    def _cancel_directory_scan(self):
+        """取消正在进行的目录扫描"""
+        if self.scan_dir_thread and self.scan_dir_thread.isRunning():
+            self.scan_dir_thread.files_found.disconnect(self._on_directory_files_found)
+            self.scan_dir_thread.cancel()
+            self.scan_dir_thread.wait()
                 
     def _select_output_directory(self):
         """选择输出目录"""
@@ -189,7 +304,11 @@ class MainWindow(QMainWindow):
         self._update_quality_display(quality)
         
     def _convert_images(self):
-        """转换图片"""
+        """转换图片，转换过程中再次点击则取消转换"""
+        if self.convert_thread and self.convert_thread.isRunning():
+            self._cancel_conversion()
+            return
+        
         # 检查是否有选中文件
         if self.grid_view_manager.get_file_count() == 0:
             show_message(self, "提示", "请先选择要转换的图片")
@@ -227,11 +346,37 @@ class MainWindow(QMainWindow):
                 except ValueError:
                     bit_depth = 8
         
+        # 并行转换进程数，默认使用全部CPU核心
+        workers = self.settings.value("workers", os.cpu_count() or 1, type=int)
+        # 并行转换的内存预算，如"24G"，未设置时不限制
+        memory_budget = self.settings.value("memory_budget", "", type=str)
+        memory_budget = parse_size(memory_budget) if memory_budget else None
+        # 转换结果缓存目录，未设置时不使用缓存
+        cache_dir = self.settings.value("result_cache_dir", "", type=str)
+        if cache_dir and self.result_cache is None:
+            cache_bytes = parse_size(self.settings.value("result_cache_size", "10G", type=str))
+            # 命中时用硬链接生成输出需显式开启，输出与缓存共享数据，为只读文件
+            hardlink = self.settings.value("result_cache_hardlink", False, type=bool)
+            self.result_cache = ResultCache(cache_dir, cache_bytes, hardlink)
+        
         # 获取图片文件列表
         image_files = self.grid_view_manager.get_file_paths()
         
-        # 预扫描冲突（在主线程中执行）
-        conflict_info = self.conversion_service._scan_for_conflicts(image_files, output_dir, format_ext, replace)
+        # 在后台线程中扫描输出目录冲突，避免大量文件时界面卡顿
+        self._convert_params = (image_files, output_dir, format_ext, quality, bit_depth, replace, workers, memory_budget)
+        self.ui.run.setEnabled(False)
+        self.ui.statusbar.showMessage("正在检查文件冲突...")
+        
+        self.scan_thread = ConflictScanThread(self.conversion_service, image_files, output_dir, format_ext, replace, quality, bit_depth)
+        self.scan_thread.progress_signal.connect(
+            lambda current, total: self.ui.statusbar.showMessage(f"正在检查文件冲突 ({current}/{total})")
+        )
+        self.scan_thread.complete_signal.connect(self._on_conflict_scan_complete)
+        self.scan_thread.start()
+        
+    def _on_conflict_scan_complete(self, conflict_info, output_index):
+        """冲突扫描完成，询问用户后启动转换线程"""
+        image_files, output_dir, format_ext, quality, bit_depth, replace, workers, memory_budget = self._convert_params
         
         # 如果有冲突，在主线程中询问用户
         user_decisions = {}
@@ -243,57 +388,28 @@ class MainWindow(QMainWindow):
                 user_decisions = self.conversion_service.create_user_decisions(conflict_info, False)
         
         # 执行转换
-        def on_progress(current, total, filename):
-            self.ui.statusbar.showMessage(f"正在转换 ({current}/{total}): {filename}")
+        def on_progress(snapshot):
+            self.ui.statusbar.showMessage(format_progress(snapshot))
             
         def on_complete(success_count, error_count, conflict_info):
-            self.ui.statusbar.showMessage(f"转换完成: 成功 {success_count} 个, 失败 {error_count} 个")
-            show_message(self, "完成", f"转换完成:\n成功: {success_count} 个\n失败: {error_count} 个")
+            self.ui.run.setText("执行")
+            self.ui.run.setEnabled(True)
+            records = self.convert_thread.records
+            cancelled_count = sum(r['status'] == 'cancelled' for r in records)
+            title = "转换已取消" if cancelled_count else "转换完成"
+            # 状态栏显示各阶段总耗时，便于定位慢在哪个环节
+            stage_summary = format_summary(summarize(records))
+            self.ui.statusbar.showMessage(f"{title}: 成功 {success_count} 个, 失败 {error_count} 个 | {stage_summary}")
+            message = f"{title}:\n成功: {success_count} 个\n失败: {error_count} 个"
+            if cancelled_count:
+                message += f"\n未完成: {cancelled_count} 个（再次执行相同转换时会跳过已完成的文件）"
+            show_message(self, "完成", message)
             
         # 立即显示开始转换的进度信息
         total_files = len(image_files)
         self.ui.statusbar.showMessage(f"开始转换: 共 {total_files} 个文件")
             
         # 在线程中执行转换以避免阻塞UI
-        from PySide6.QtCore import QThread, Signal
-        
-        class ConvertThread(QThread):
-            progress_signal = Signal(int, int, str)
-            complete_signal = Signal(int, int, object)
-            
-            def __init__(self, conversion_service, image_files, output_dir, format_ext, quality, bit_depth, replace, user_decisions, parent_window=None):
-                super().__init__()
-                self.conversion_service = conversion_service
-                self.image_files = image_files
-                self.output_dir = output_dir
-                self.format_ext = format_ext
-                self.quality = quality
-                self.bit_depth = bit_depth
-                self.replace = replace
-                self.user_decisions = user_decisions
-                self.parent_window = parent_window
-                
-            def run(self):
-                def progress_callback(current, total, filename):
-                    self.progress_signal.emit(current, total, filename)
-                    
-                # 立即发送第一个进度信号，显示开始转换
-                if self.image_files:
-                    self.progress_signal.emit(0, len(self.image_files), "开始转换...")
-                    
-                success_count, error_count, conflict_info = self.conversion_service.convert_images(
-                    self.image_files,
-                    self.output_dir,
-                    self.format_ext,
-                    self.quality,
-                    self.bit_depth,  # 传递位深参数
-                    self.replace,
-                    progress_callback,
-                    self.parent_window,
-                    self.user_decisions  # 传递用户决策
-                )
-                self.complete_signal.emit(success_count, error_count, conflict_info)
-        
         # 创建并启动转换线程
         self.convert_thread = ConvertThread(
             self.conversion_service,
@@ -304,15 +420,29 @@ class MainWindow(QMainWindow):
             bit_depth,  # 传递位深参数
             replace,
             user_decisions,  # 传递用户决策
-            self  # 传递父窗口引用
+            self,  # 传递父窗口引用
+            workers,
+            output_index,  # 复用预扫描的输出目录索引
+            memory_budget,
+            self.result_cache
         )
         
         # 连接信号
         self.convert_thread.progress_signal.connect(on_progress)
         self.convert_thread.complete_signal.connect(on_complete)
         
-        # 启动线程
+        # 启动线程，转换过程中执行按钮变为取消按钮
+        # 在线程启动前创建取消事件，线程开始执行前点击取消也能生效
+        self.conversion_service.reset_cancel()
         self.convert_thread.start()
+        self.ui.run.setText("取消")
+        self.ui.run.setEnabled(True)
+        
+    def _cancel_conversion(self):
+        """取消正在进行的转换，已完成的文件记录在任务日志中"""
+        self.conversion_service.cancel()
+        self.ui.run.setEnabled(False)
+        self.ui.statusbar.showMessage("正在取消转换...")
         
     def closeEvent(self, event):
         """关闭事件，保存设置并清理资源"""
@@ -320,9 +450,19 @@ class MainWindow(QMainWindow):
         self.settings.setValue("output_dir", self.ui.lineEdit.text())
         self.settings.setValue("quality", self.ui.qualityValue.value())
         
-        # 清理缩略图管理器的工作线程
-        if hasattr(self.grid_view_manager, 'thumbnail_manager'):
-            self.grid_view_manager.thumbnail_manager.cleanup()
+        # 停止目录扫描
+        self._cancel_directory_scan()
+        
+        # 停止正在进行的转换
+        if self.convert_thread and self.convert_thread.isRunning():
+            self.conversion_service.cancel()
+            self.convert_thread.wait()
+        if self.result_cache:
+            self.result_cache.close()
+        
+        # 清理缩略图管理器的工作线程并关闭缩略图存储
+        if self.grid_view_manager.grid_view is not None:
+            self.grid_view_manager.grid_view.thumbnail_manager.cleanup()
         
         event.accept()
 
@@ -336,6 +476,8 @@ def resource_path(relative_path):
     return os.path.join(base_path, relative_path)
 
 def main():
+    # 打包后的程序启动转换进程池时需要
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     # 设置应用程序图标
     icon_path = resource_path("icons/icon2.ico")
@@ -358,6 +500,11 @@ def main():
     window.setWindowIcon(app_icon)
     window.show()
     
+    # 窗口显示后输出启动耗时分析
+    if '--profile-startup' in sys.argv:
+        from core.startup_profile import report
+        QTimer.singleShot(0, report)
+    
     sys.exit(app.exec())
 
 
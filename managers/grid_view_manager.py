@@ -5,6 +5,7 @@
 import os
 from PySide6.QtCore import Qt
 
+from core.file_collection import FileCollection
 from widgets.thumbnail_grid_view import ThumbnailGridView
 
 
@@ -20,7 +21,8 @@ class GridViewManager:
         """
         self.parent_widget = parent_widget
         self.grid_view = None
-        self.image_files = []
+        # 与网格视图模型共享的带索引文件集合
+        self.image_files = FileCollection()
         
     def setup_grid_view(self, layout, existing_list_view):
         """
@@ -31,7 +33,7 @@ class GridViewManager:
             existing_list_view: 现有的列表视图（将被替换）
         """
         # 创建网格视图
-        self.grid_view = ThumbnailGridView(self.parent_widget)
+        self.grid_view = ThumbnailGridView(self.parent_widget, self.image_files)
         
         # 获取现有列表视图的位置和大小
         index = layout.indexOf(existing_list_view)
@@ -56,16 +58,11 @@ class GridViewManager:
         Returns:
             list: 成功添加的文件列表
         """
-        # 过滤已存在的文件
-        new_files = [f for f in files if f not in self.image_files]
-        
-        if new_files:
-            # 添加到数据列表
-            self.image_files.extend(new_files)
-            
-            # 更新网格视图显示
-            if self.grid_view:
-                self.grid_view.set_files(self.image_files)
+        # 集合负责去重，网格视图只插入新增的行
+        if self.grid_view:
+            new_files = self.grid_view.add_files(files)
+        else:
+            new_files = self.image_files.extend(files)
             
         return new_files
     
@@ -76,21 +73,19 @@ class GridViewManager:
             
         selected_files = self.grid_view.get_selected_files()
         if selected_files:
-            # 从数据列表中移除选中的文件
-            self.image_files = [f for f in self.image_files if f not in selected_files]
-            
-            # 更新网格视图
-            self.grid_view.set_files(self.image_files)
+            # 从共享的文件集合和网格视图中删除选中的行
+            self.grid_view.remove_files(selected_files)
             
         return len(selected_files)
     
     def clear_all(self):
         """清空所有文件"""
         count = len(self.image_files)
-        self.image_files.clear()
         
         if self.grid_view:
             self.grid_view.clear_files()
+        else:
+            self.image_files.clear()
             
         return count
     
@@ -100,4 +95,4 @@ class GridViewManager:
     
     def get_file_paths(self):
         """获取所有文件路径"""
-        return self.image_files[:]
\ No newline at end of file
+        return list(self.image_files)
\ No newline at end of file
@@ -5,6 +5,8 @@
 import os
 from PySide6.QtCore import QStringListModel
 
+from core.file_collection import FileCollection
+
 
 class ImageListManager:
     """图片列表管理器"""
@@ -17,7 +19,7 @@ class ImageListManager:
             list_view: QListView实例
         """
         self.list_view = list_view
-        self.image_files = []
+        self.image_files = FileCollection()
         self.model = None
     
     def add_files(self, files):
@@ -27,13 +29,10 @@ class ImageListManager:
         Args:
             files: 文件路径列表
         """
-        # 过滤已存在的文件
-        new_files = [f for f in files if f not in self.image_files]
+        # 集合负责过滤已存在的文件
+        new_files = self.image_files.extend(files)
         
         if new_files:
-            # 添加到数据列表
-            self.image_files.extend(new_files)
-            
             # 更新UI显示
             self._update_list_view()
             
@@ -48,13 +47,9 @@ class ImageListManager:
         if not selected_indexes:
             return 0
             
-        # 按行号排序（从大到小），以便从后往前删除
-        selected_rows = sorted([index.row() for index in selected_indexes], reverse=True)
-        
-        # 删除选中的项目
-        for row in selected_rows:
-            if row < len(self.image_files):
-                self.image_files.pop(row)
+        # 按连续区间从后往前删除选中的项目
+        selected_rows = [index.row() for index in selected_indexes if index.row() < len(self.image_files)]
+        self.image_files.remove_rows(selected_rows)
         
         # 更新UI显示
         self._update_list_view()
@@ -89,7 +84,7 @@ class ImageListManager:
         Returns:
             list: 文件路径列表
         """
-        return self.image_files[:]
+        return list(self.image_files)
     
     def _update_list_view(self):
         """更新列表视图显示"""
@@ -3,38 +3,173 @@
 负责生成和管理图片缩略图
 """
 import os
-from pathlib import Path
-from PySide6.QtCore import QObject, Signal, QThread, QSize
-from PySide6.QtGui import QPixmap, QImageReader
-from PySide6.QtWidgets import QApplication
+import heapq
+import time
+from collections import OrderedDict, deque
+from PySide6.QtCore import Qt, QObject, Signal, QRunnable, QThread, QThreadPool, QSize, QBuffer, QByteArray, QIODevice, QStandardPaths
+from PySide6.QtGui import QPixmap, QImage, QImageReader, QTransform
 
+from core.image_probe import RAW_EXTENSIONS
+from core.thumbnail_store import ThumbnailStore
 
-class ThumbnailWorker(QThread):
-    """缩略图生成工作线程"""
-    thumbnail_ready = Signal(str, QPixmap)  # 文件路径, 缩略图
+
+class ThumbnailWorkerSignals(QObject):
+    """缩略图工作任务信号"""
+    thumbnail_ready = Signal(str, QImage)  # 文件路径, 缩略图
+    finished = Signal(str)  # 文件路径（无论成功与否都会发出）
+
+
+class ThumbnailWorker(QRunnable):
+    """缩略图生成任务，在线程池中执行"""
     
-    def __init__(self, file_path, size):
+    def __init__(self, file_path, size, store=None):
         super().__init__()
         self.file_path = file_path
         self.size = size
+        self.store = store
+        self.signals = ThumbnailWorkerSignals()
     
     def run(self):
         """生成缩略图"""
         try:
-            # 使用QImageReader加载图片，支持更多格式
-            reader = QImageReader(self.file_path)
-            reader.setAutoTransform(True)
+            # 先查磁盘缓存，命中时不读取源图片
+            key = None
+            if self.store:
+                stat = os.stat(self.file_path)
+                key = ThumbnailStore.make_key(self.file_path, stat.st_size, stat.st_mtime_ns, (self.size.width(), self.size.height()))
+                data = self.store.get(key)
+                if data:
+                    image = QImage.fromData(data)
+                    if not image.isNull():
+                        self.signals.thumbnail_ready.emit(self.file_path, image)
+                        return
             
-            # 设置缩略图大小
-            reader.setScaledSize(self.size)
+            if os.path.splitext(self.file_path)[1].lower() in RAW_EXTENSIONS:
+                # RAW文件使用内嵌预览图，QImageReader无法读取RAW
+                image = self._read_raw_preview()
+            else:
+                # 使用QImageReader加载图片，支持更多格式
+                reader = QImageReader(self.file_path)
+                reader.setAutoTransform(True)
+                image = self._read_scaled(reader)
             
-            # 读取图片
-            image = reader.read()
             if not image.isNull():
-                pixmap = QPixmap.fromImage(image)
-                self.thumbnail_ready.emit(self.file_path, pixmap)
+                self.signals.thumbnail_ready.emit(self.file_path, image)
+                if key:
+                    self.store.put(key, self._encode(image))
         except Exception as e:
             print(f"生成缩略图失败 {self.file_path}: {e}")
+        finally:
+            self.signals.finished.emit(self.file_path)
+    
+    def _read_scaled(self, reader):
+        """按缩略图大小读取图片，保持宽高比，JPEG可在解码时直接缩小"""
+        source_size = reader.size()
+        if source_size.isValid():
+            reader.setScaledSize(source_size.scaled(self.size, Qt.AspectRatioMode.KeepAspectRatio))
+        else:
+            reader.setScaledSize(self.size)
+        
+        # QPixmap只能在GUI线程中创建，这里只返回QImage
+        return reader.read()
+    
+    def _read_raw_preview(self):
+        """读取RAW文件的内嵌预览图，没有预览图时以半尺寸解码"""
+        import numpy as np
+        import rawpy
+        
+        raw = rawpy.RawPy()
+        try:
+            # 只解析文件头和预览图，不解包传感器数据
+            raw.open_file(self.file_path)
+            try:
+                thumb = raw.extract_thumb()
+            except (rawpy.LibRawNoThumbnailError, rawpy.LibRawUnsupportedThumbnailError):
+                thumb = None
+            
+            if thumb is not None and thumb.format == rawpy.ThumbFormat.JPEG:
+                buffer = QBuffer()
+                buffer.setData(QByteArray(thumb.data))
+                buffer.open(QIODevice.OpenModeFlag.ReadOnly)
+                image = self._read_scaled(QImageReader(buffer))
+            else:
+                if thumb is not None:
+                    rgb = thumb.data
+                else:
+                    rgb = raw.postprocess(use_camera_wb=True, half_size=True, output_bps=8)
+                rgb = np.ascontiguousarray(rgb)
+                image = QImage(rgb.data, rgb.shape[1], rgb.shape[0], rgb.strides[0], QImage.Format.Format_RGB888).scaled(
+                    self.size, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation
+                )
+                if thumb is None:
+                    # 半尺寸解码时LibRaw已经处理了方向
+                    return image
+            
+            # 内嵌预览图按RAW记录的方向旋转
+            angle = {3: 180, 5: 270, 6: 90}.get(raw.sizes.flip)
+            if angle and not image.isNull():
+                image = image.transformed(QTransform().rotate(angle))
+            return image
+        finally:
+            raw.close()
+    
+    def _encode(self, image):
+        """将缩略图编码为紧凑的JPEG（有透明通道时使用PNG）"""
+        buffer = QBuffer()
+        buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+        if image.hasAlphaChannel():
+            image.save(buffer, "PNG")
+        else:
+            image.save(buffer, "JPG", 85)
+        return bytes(buffer.data())
+
+
+class PixmapCache:
+    """按内存预算进行LRU淘汰的缩略图缓存"""
+    
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()  # 文件路径 -> (缩略图, 占用字节数)
+    
+    def __contains__(self, key):
+        return key in self._items
+    
+    def __len__(self):
+        return len(self._items)
+    
+    def get(self, key):
+        """获取缩略图并标记为最近使用，同时统计命中率"""
+        item = self._items.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._items.move_to_end(key)
+        return item[0]
+    
+    def put(self, key, pixmap):
+        """加入缩略图，超出内存预算时淘汰最久未使用的缩略图"""
+        self.remove(key)
+        cost = pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8
+        self._items[key] = (pixmap, cost)
+        self.total_bytes += cost
+        while self.total_bytes > self.max_bytes and len(self._items) > 1:
+            _, (_, old_cost) = self._items.popitem(last=False)
+            self.total_bytes -= old_cost
+    
+    def remove(self, key):
+        """移除缩略图"""
+        item = self._items.pop(key, None)
+        if item:
+            self.total_bytes -= item[1]
+    
+    def clear(self):
+        """清空缓存"""
+        self._items.clear()
+        self.total_bytes = 0
 
 
 class ThumbnailManager(QObject):
@@ -42,25 +177,43 @@ class ThumbnailManager(QObject):
     
     thumbnail_loaded = Signal(str)  # 缩略图加载完成信号
     
-    def __init__(self, thumbnail_size=QSize(100, 100)):
+    def __init__(self, thumbnail_size=QSize(100, 100), max_workers=None, cache_bytes=256 * 1024 * 1024, memory_bytes=64 * 1024 * 1024):
         super().__init__()
         self.thumbnail_size = thumbnail_size
-        self.thumbnail_cache = {}  # 文件路径 -> 缩略图
-        self.pending_requests = set()  # 正在处理的请求
-        self.active_workers = []  # 活跃的工作线程列表
+        self.thumbnail_cache = PixmapCache(memory_bytes)  # 文件路径 -> 已缩放到目标大小的缩略图
+        self.pending_requests = set()  # 排队中和处理中的请求
+        self.active_workers = {}  # 文件路径 -> 正在执行的任务
+        self.visible_files = set()  # 当前可见的文件
+        
+        # 固定大小的线程池，排队由管理器自己维护以便调整优先级和取消
+        self.thread_pool = QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(max_workers or min(4, QThread.idealThreadCount()))
+        self._queue = []  # 优先队列: (优先级, 序号, 文件路径)
+        self._queued = {}  # 文件路径 -> 序号，用于识别已取消的队列项
+        self._seq = 0
+        self._completed_times = deque(maxlen=1000)  # 最近完成时间，用于统计速率
         
+        # 持久化缩略图缓存，重新打开同一文件夹时无需重新解码原图
+        self.store = None
+        try:
+            cache_dir = QStandardPaths.writableLocation(QStandardPaths.StandardLocation.CacheLocation)
+            self.store = ThumbnailStore(os.path.join(cache_dir, "thumbnails.db"), cache_bytes)
+        except Exception as e:
+            print(f"打开缩略图缓存失败: {e}")
+    
     def get_thumbnail(self, file_path):
         """
         获取缩略图
         
         Args:
             file_path: 图片文件路径
-            
+        
         Returns:
             QPixmap or None: 缩略图，如果缓存中不存在则返回None
         """
-        if file_path in self.thumbnail_cache:
-            return self.thumbnail_cache[file_path]
+        pixmap = self.thumbnail_cache.get(file_path)
+        if pixmap is not None:
+            return pixmap
         
         # 如果不在缓存中且没有正在处理，则启动异步加载
         if file_path not in self.pending_requests:
@@ -69,46 +222,115 @@ class ThumbnailManager(QObject):
         return None
     
     def _load_thumbnail_async(self, file_path):
-        """异步加载缩略图"""
+        """将缩略图请求加入优先队列，可见文件优先"""
         if not os.path.exists(file_path):
             return
-            
+        
         self.pending_requests.add(file_path)
-        worker = ThumbnailWorker(file_path, self.thumbnail_size)
-        worker.thumbnail_ready.connect(self._on_thumbnail_ready)
-        worker.finished.connect(lambda: self._on_worker_finished(worker))
-        self.active_workers.append(worker)
-        worker.start()
-    
-    def _on_thumbnail_ready(self, file_path, pixmap):
-        """缩略图加载完成"""
-        self.pending_requests.discard(file_path)
-        self.thumbnail_cache[file_path] = pixmap
+        self._seq += 1
+        self._queued[file_path] = self._seq
+        priority = 0 if file_path in self.visible_files else 1
+        heapq.heappush(self._queue, (priority, self._seq, file_path))
+        self._schedule()
+    
+    def _schedule(self):
+        """在线程池有空闲时启动队列中的任务"""
+        while self._queue and len(self.active_workers) < self.thread_pool.maxThreadCount():
+            _, seq, file_path = heapq.heappop(self._queue)
+            # 跳过已取消或已被重新排队的项
+            if self._queued.get(file_path) != seq:
+                continue
+            del self._queued[file_path]
+            if file_path in self.active_workers:
+                continue
+            
+            worker = ThumbnailWorker(file_path, self.thumbnail_size, self.store)
+            worker.signals.thumbnail_ready.connect(self._on_thumbnail_ready)
+            worker.signals.finished.connect(self._on_worker_finished)
+            self.active_workers[file_path] = worker
+            self.thread_pool.start(worker)
+    
+    def set_visible_files(self, file_paths):
+        """
+        更新当前可见的文件，取消已滚出视图且尚未开始的请求
+        
+        Args:
+            file_paths: 可见文件路径集合
+        
+        Returns:
+            int: 取消的请求数量
+        """
+        self.visible_files = set(file_paths)
+        cancelled = [f for f in self._queued if f not in self.visible_files]
+        for file_path in cancelled:
+            del self._queued[file_path]
+            self.pending_requests.discard(file_path)
+        
+        # 剩余的队列项都可见，重建队列提升其优先级
+        self._queue = [(0, seq, f) for f, seq in self._queued.items()]
+        heapq.heapify(self._queue)
+        return len(cancelled)
+    
+    def _on_thumbnail_ready(self, file_path, image):
+        """缩略图加载完成，缓存前缩放到目标大小，绘制时无需再缩放"""
+        if image.width() > self.thumbnail_size.width() or image.height() > self.thumbnail_size.height():
+            image = image.scaled(
+                self.thumbnail_size,
+                Qt.AspectRatioMode.KeepAspectRatio,
+                Qt.TransformationMode.SmoothTransformation
+            )
+        self.thumbnail_cache.put(file_path, QPixmap.fromImage(image))
         # 发出缩略图加载完成信号
         self.thumbnail_loaded.emit(file_path)
     
-    def _on_worker_finished(self, worker):
-        """工作线程完成处理"""
-        if worker in self.active_workers:
-            self.active_workers.remove(worker)
+    def _on_worker_finished(self, file_path):
+        """工作任务完成处理"""
+        self.active_workers.pop(file_path, None)
+        self.pending_requests.discard(file_path)
+        self._completed_times.append(time.monotonic())
+        self._schedule()
+    
+    def get_stats(self):
+        """
+        获取缩略图加载统计信息，用于调优
+        
+        Returns:
+            dict: 队列深度、处理中数量、每秒完成数量、线程数和内存缓存命中情况
+        """
+        now = time.monotonic()
+        return {
+            'queue_depth': len(self._queued),
+            'in_flight': len(self.active_workers),
+            'completed_per_sec': sum(1 for t in self._completed_times if now - t <= 1.0),
+            'max_workers': self.thread_pool.maxThreadCount(),
+            'cache_hits': self.thumbnail_cache.hits,
+            'cache_misses': self.thumbnail_cache.misses,
+            'cache_bytes': self.thumbnail_cache.total_bytes,
+            'cache_items': len(self.thumbnail_cache),
+        }
     
     def clear_cache(self):
         """清空缩略图缓存"""
         self.thumbnail_cache.clear()
         self.pending_requests.clear()
+        self._queue.clear()
+        self._queued.clear()
     
     def remove_thumbnail(self, file_path):
         """移除指定文件的缩略图"""
-        if file_path in self.thumbnail_cache:
-            del self.thumbnail_cache[file_path]
+        self.thumbnail_cache.remove(file_path)
+        self._queued.pop(file_path, None)
         self.pending_requests.discard(file_path)
     
     def cleanup(self):
         """清理所有工作线程"""
-        # 终止所有活跃的工作线程
-        for worker in self.active_workers:
-            if worker.isRunning():
-                worker.quit()
-                worker.wait(1000)  # 等待1秒让线程正常结束
+        # 丢弃排队中的任务，等待正在执行的任务结束
+        self._queue.clear()
+        self._queued.clear()
+        self.thread_pool.clear()
+        self.thread_pool.waitForDone(1000)  # 等待1秒让线程正常结束
         self.active_workers.clear()
-        self.clear_cache()
\ No newline at end of file
+        self.clear_cache()
+        if self.store:
+            self.store.close()
+            self.store = None
@@ -2,21 +2,64 @@
 转换服务模块
 """
 import os
+import sys
+import time
 from pathlib import Path
-import cv2 as cv
-from PIL import Image
-import rawpy
 
 from core.image_converter import ImageConverter
-from core.utils import show_question, show_message
+from core.image_probe import probe_image, RAW_EXTENSIONS
+from core.job_journal import JobJournal, UNCHANGED, STALE, NEW
+from core.memory_budget import estimate_working_set
+from core.file_ops import fast_copy
+from core.result_cache import copy_or_link
+from core.stage_timer import StageTimer, ConversionCancelled
+from core.utils import show_question, show_message, peak_rss_bytes
+
+# 工作进程内复用的转换服务实例
+_worker_service = None
+
+
+def _process_context():
+    """
+    获取进程池和取消事件使用的multiprocessing上下文
+    统一使用spawn启动工作进程：Linux默认的fork会复制主进程中Qt和rawpy的OpenMP线程池状态，可能导致工作进程死锁
+    
+    Returns:
+        multiprocessing上下文
+    """
+    import multiprocessing
+    return multiprocessing.get_context('spawn')
+
+
+def _init_worker(cancel_event):
+    """初始化工作进程，共享主进程的取消事件"""
+    global _worker_service
+    # Ctrl+C由主进程处理并通过取消事件通知，工作进程忽略SIGINT，避免进程池异常中断
+    import signal
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if sys.platform.startswith('linux'):
+        # 主进程被强制终止（如第二次Ctrl+C）时工作进程随之退出，不在后台继续编码
+        import ctypes
+        PR_SET_PDEATHSIG = 1
+        ctypes.CDLL(None).prctl(PR_SET_PDEATHSIG, signal.SIGKILL)
+    _worker_service = ConversionService()
+    _worker_service._cancel_event = cancel_event
+
+
+def _convert_task_in_worker(image_path, output_path, output_format, quality, bit_depth, resize=None):
+    """在进程池的工作进程中转换单个文件"""
+    return _worker_service._convert_task(image_path, output_path, output_format, quality, bit_depth, resize)
+
 
 class ConversionService:
     def __init__(self):
         """初始化转换服务"""
         self.converter = ImageConverter()
         self.parent_window = None
+        self.conflict_extensions = self._get_conflict_extensions()
+        self._cancel_event = None
 
-    def convert_images(self, image_files, output_dir, output_format, quality=85, bit_depth=None, replace=False, progress_callback=None, parent_window=None, user_decisions=None):
+    def convert_images(self, image_files, output_dir, output_format, quality=85, bit_depth=None, replace=False, progress_callback=None, parent_window=None, user_decisions=None, workers=1, output_index=None, result_callback=None, resize=None, journal=True, incremental=False, verify_hash=False, memory_budget=None, result_cache=None):
         """
         转换图片文件
         
@@ -30,139 +73,451 @@ class ConversionService:
             progress_callback: 进度回调函数
             parent_window: 父窗口，用于显示对话框
             user_decisions: 用户决策字典（由调用方提供）
+            workers: 并行转换的进程数，1表示在当前线程中逐个转换
+            output_index: 预扫描得到的输出目录索引，为None时重新扫描
+            result_callback: 单个文件处理结果回调函数，参数为结果记录字典
+                (input, output, status, error, seconds, stages, bytes_read, bytes_written, peak_rss)，
+                status为success/failed/skipped/cancelled/resumed，stages为 阶段名 -> 耗时（秒），
+                peak_rss为转换该文件的进程截至此时的峰值内存
+            resize: 缩放参数，如 ('long_edge', 2560)，为None时保持原尺寸
+            journal: 是否使用输出目录中的任务日志，跳过已按相同参数完成的文件
+            incremental: 增量模式，任务日志中源文件或参数已变化的输出文件视为过期，不经冲突检查直接重新转换覆盖
+            verify_hash: 在任务日志中记录源文件内容哈希，修改时间变化但内容相同的源文件仍视为未变化
+            memory_budget: 并行转换时进行中任务的估算工作集总和上限（字节），为None时不限制
+            result_cache: 转换结果缓存（ResultCache），命中时直接链接或复制缓存中的输出，
+                同一批次中内容相同的输入只转换一次
             
         Returns:
             tuple: (成功数量, 失败数量, 详细信息字典)
         """
         success_count = 0
         error_count = 0
+        # 调用方未通过reset_cancel()预先创建取消事件时在此创建
+        if self._cancel_event is None:
+            self.reset_cancel()
         
         # 设置父窗口引用
         if parent_window:
             self.parent_window = parent_window
         
-        # 预扫描阶段 - 收集所有冲突信息
-        conflict_info = self._scan_for_conflicts(image_files, output_dir, output_format, replace)
+        # 只用stat对照任务日志判断各文件状态，未变化的文件（增量模式下还有过期的文件）不参与冲突检查
+        states = {}
+        journal = JobJournal(output_dir) if journal or incremental else None
+        if journal:
+            params = JobJournal.make_params(output_format, quality, bit_depth, resize)
+            for image_path in image_files:
+                states[image_path] = journal.check(image_path, self.get_output_path(image_path, output_dir, output_format), params, verify_hash)
+        handled_states = (UNCHANGED, STALE) if incremental else (UNCHANGED,)
+        
+        # 预扫描阶段 - 收集所有冲突信息，复用调用方已建立的输出目录索引
+        if output_index is None:
+            output_index = self.build_output_index(output_dir)
+        conflict_info = self._scan_for_conflicts(
+            [p for p in image_files if states.get(p, NEW) not in handled_states],
+            output_dir, output_format, replace, output_index=output_index
+        )
         
         # 如果用户决策未提供，使用空字典
         if user_decisions is None:
             user_decisions = {}
         
         total = len(image_files)
-        for i, image_path in enumerate(image_files):
+        done = 0
+        # 待转换任务列表: (输入路径, 输出路径)
+        tasks = []
+        for image_path in image_files:
             try:
                 # 生成输出文件路径
                 filename = Path(image_path).stem
+                output_path = self.get_output_path(image_path, output_dir, output_format)
                 
-                # 如果output_format为None，表示保持原格式
-                if output_format is None:
-                    # 获取原文件的扩展名
-                    original_ext = Path(image_path).suffix.lower()
-                    # 处理JPEG格式的特殊情况
-                    if original_ext in ['.jpg', '.jpeg']:
-                        output_filename = f"{filename}.jpg"
-                    else:
-                        output_filename = f"{filename}{original_ext}"
-                else:
-                    # 确保JPEG格式使用.jpg扩展名而不是.jpeg
-                    if output_format.upper() == 'JPEG':
-                        output_filename = f"{filename}.jpg"
-                    else:
-                        output_filename = f"{filename}.{output_format.lower()}"
-                output_path = os.path.join(output_dir, output_filename)
+                # 任务日志中已按相同参数完成的文件直接跳过，中断的任务可以快速续跑
+                state = states.get(image_path, NEW)
+                if state == UNCHANGED:
+                    success_count += 1
+                    done += 1
+                    if result_callback:
+                        result_callback(self._make_record(image_path, output_path, 'resumed'))
+                    if progress_callback:
+                        progress_callback(done, total, image_path)
+                    continue
                 
                 # 检查是否应该跳过
                 should_skip = False
-                if image_path in user_decisions:
+                skip_reason = None
+                if output_format is None and resize and Path(image_path).suffix.lower() in RAW_EXTENSIONS:
+                    # RAW无法按原格式重新编码，保持原格式时不能缩放
+                    should_skip = True
+                    skip_reason = "RAW文件无法按原格式缩放"
+                elif state in handled_states:
+                    # 增量模式下过期的输出文件由本程序生成，直接覆盖
+                    pass
+                elif image_path in user_decisions:
                     decision = user_decisions[image_path]
                     if decision == 'skip':
                         should_skip = True
                     elif decision == 'replace':
                         # 删除冲突文件
                         if image_path in conflict_info:
-                            for conflict_file in conflict_info[image_path]['conflict_files']:
-                                try:
-                                    os.remove(conflict_file)
-                                except Exception as e:
-                                    print(f"删除冲突文件失败 {conflict_file}: {e}")
-                elif not replace and os.path.exists(output_path):
+                            self._delete_conflict_files(conflict_info[image_path]['conflict_files'], output_index)
+                elif not replace and self._index_contains(output_index, output_path):
                     # 未选中替换且文件存在，直接跳过
                     should_skip = True
                 elif replace:
-                    # 选中替换时的自动处理
-                    conflict_files = self._find_conflict_files(output_dir, filename)
-                    if conflict_files:
-                        # 自动删除冲突文件
-                        for conflict_file in conflict_files:
-                            try:
-                                os.remove(conflict_file)
-                            except Exception as e:
-                                print(f"删除冲突文件失败 {conflict_file}: {e}")
+                    # 选中替换时的自动处理：自动删除冲突文件
+                    self._delete_conflict_files(self._find_conflict_files(output_dir, filename, output_index), output_index)
                 
                 if should_skip:
                     error_count += 1
-                    print(f"跳过文件: {output_path}")
+                    done += 1
+                    print(f"跳过文件: {output_path}" + (f"（{skip_reason}）" if skip_reason else ""))
+                    if result_callback:
+                        result_callback(self._make_record(image_path, output_path, 'skipped', skip_reason))
                     # 调用进度回调
                     if progress_callback:
-                        progress_callback(i + 1, total, image_path)
+                        progress_callback(done, total, image_path)
                     continue
                 
-                # 检查是否需要完全保持原样（原格式、原位深、quality=100）
-                is_keep_original = (output_format is None and bit_depth is None and quality == 100)
-                
-                if is_keep_original:
-                    # 完全保持原样，直接复制文件
-                    import shutil
-                    try:
-                        shutil.copy2(image_path, output_path)
-                        success = True
-                        error = None
-                    except Exception as copy_error:
-                        success = False
-                        error = str(copy_error)
-                else:
-                    # 检查位深兼容性
-                    is_compatible, actual_bit_depth = self._check_bit_depth_compatibility(image_path, bit_depth)
-                    
-                    # 如果位深不兼容，记录日志而不显示对话框
-                    if not is_compatible and bit_depth is not None:
-                        original_bit_depth = self._get_image_bit_depth(image_path)
-                        message = f"{os.path.basename(image_path)}: {original_bit_depth}位→{bit_depth}位（自动调整为8位）"
-                        
-                        # 只在控制台输出，避免线程安全问题
-                        print(f"[位深调整] {message}")
-                    
-                    # 执行转换
-                    # 如果output_format为None，表示保持原格式，不进行格式转换
-                    if output_format is None:
-                        # 直接复制文件，保持原格式
-                        import shutil
-                        try:
-                            shutil.copy2(image_path, output_path)
-                            success = True
-                            error = None
-                        except Exception as copy_error:
-                            success = False
-                            error = str(copy_error)
-                    else:
-                        success, error = self.converter.convert(image_path, output_path, output_format, quality, actual_bit_depth)
-                
-                if success:
-                    success_count += 1
-                else:
-                    error_count += 1
-                    print(f"转换失败 {image_path}: {error}")
-                
-                # 调用进度回调
-                if progress_callback:
-                    progress_callback(i + 1, total, image_path)
+                tasks.append((image_path, output_path))
+                # 记录到索引中，同名输入不会互相覆盖
+                output_index.setdefault(os.path.normcase(filename), []).append(output_path)
                     
             except Exception as e:
                 error_count += 1
+                done += 1
                 print(f"转换异常 {image_path}: {str(e)}")
+                if result_callback:
+                    result_callback(self._make_record(image_path, None, 'failed', str(e)))
         
+        # 执行转换，结果可能乱序到达
+        if result_cache is not None:
+            records = self._run_tasks_with_cache(tasks, result_cache, output_format, quality, bit_depth, workers, resize, memory_budget)
+        else:
+            records = self._run_tasks(tasks, output_format, quality, bit_depth, workers, resize, memory_budget)
+        for record in records:
+            done += 1
+            if record['status'] == 'success':
+                success_count += 1
+                if journal:
+                    journal.record(record['input'], record['output'], params, verify_hash)
+            elif record['status'] == 'failed':
+                error_count += 1
+                print(f"转换失败 {record['input']}: {record['error']}")
+            
+            if result_callback:
+                result_callback(record)
+            
+            # 调用进度回调
+            if progress_callback:
+                progress_callback(done, total, record['input'])
+        
+        if journal:
+            journal.close()
+        # 本次转换结束，之后的cancel()不再影响下一次转换
+        self._cancel_event = None
         return success_count, error_count, conflict_info
     
+    def get_output_path(self, image_path, output_dir, output_format):
+        """
+        生成输出文件路径
+        
+        Args:
+            image_path: 输入文件路径
+            output_dir: 输出目录
+            output_format: 输出格式，为None时保持原格式
+            
+        Returns:
+            str: 输出文件路径
+        """
+        filename = Path(image_path).stem
+        
+        # 如果output_format为None，表示保持原格式
+        if output_format is None:
+            # 获取原文件的扩展名
+            original_ext = Path(image_path).suffix.lower()
+            # 处理JPEG格式的特殊情况
+            if original_ext in ['.jpg', '.jpeg']:
+                output_filename = f"{filename}.jpg"
+            else:
+                output_filename = f"{filename}{original_ext}"
+        else:
+            # 确保JPEG格式使用.jpg扩展名而不是.jpeg
+            if output_format.upper() == 'JPEG':
+                output_filename = f"{filename}.jpg"
+            else:
+                output_filename = f"{filename}.{output_format.lower()}"
+        return os.path.join(output_dir, output_filename)
+    
+    def filter_completed(self, image_files, output_dir, output_format, quality, bit_depth, resize=None):
+        """
+        过滤掉任务日志中已按相同参数完成的文件，续跑时这些文件不再参与冲突检查
+        
+        Returns:
+            list: 尚未完成的文件路径列表
+        """
+        journal = JobJournal(output_dir)
+        params = JobJournal.make_params(output_format, quality, bit_depth, resize)
+        return [
+            image_path for image_path in image_files
+            if not journal.is_completed(image_path, self.get_output_path(image_path, output_dir, output_format), params)
+        ]
+    
+    def reset_cancel(self):
+        """
+        为下一次转换创建跨进程共享的取消事件，cancel()设置后所有工作进程在下一个阶段前停止
+        
+        调用方应在启动转换线程之前调用，线程开始执行前发出的cancel()也不会丢失
+        """
+        self._cancel_event = _process_context().Event()
+    
+    def cancel(self):
+        """请求取消正在进行的转换，正在处理的文件在下一个阶段开始前停止"""
+        if self._cancel_event is not None:
+            self._cancel_event.set()
+    
+    def _run_tasks(self, tasks, output_format, quality, bit_depth, workers, resize=None, memory_budget=None):
+        """
+        执行转换任务，workers大于1时使用进程池并行转换
+        
+        Args:
+            tasks: (输入路径, 输出路径) 列表
+            output_format: 输出格式
+            quality: 图片质量
+            bit_depth: 位深设置
+            workers: 进程数
+            resize: 缩放参数
+            memory_budget: 进行中任务的估算工作集总和上限（字节），为None时一次提交全部任务
+            
+        Yields:
+            dict: 结果记录，按完成顺序产出
+        """
+        if workers <= 1 or len(tasks) <= 1:
+            for image_path, output_path in tasks:
+                yield self._convert_task(image_path, output_path, output_format, quality, bit_depth, resize)
+            return
+        
+        # 待提交任务: (输入路径, 输出路径, 估算工作集)
+        if memory_budget:
+            # 按估算从大到小依次提交：大图先逐个（或少量）转换，后面较小的图片再多个并行，
+            # 严格按顺序提交，大图不会被小图一直插队
+            pending = sorted(
+                ((image_path, output_path, estimate_working_set(image_path, output_format, bit_depth, resize)) for image_path, output_path in tasks),
+                key=lambda task: task[2], reverse=True
+            )
+        else:
+            pending = [(image_path, output_path, 0) for image_path, output_path in tasks]
+        pending.reverse()  # 从列表末尾弹出
+        max_workers = min(workers, len(tasks))
+        
+        # rawpy、PIL和HEIF编码器会长时间持有GIL，因此使用进程而非线程
+        from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=_process_context(),
+            initializer=_init_worker,
+            initargs=(self._cancel_event,)
+        ) as executor:
+            running = {}  # future -> 待提交任务元组
+            in_use = 0
+            while pending or running:
+                # 有预算时只提交能立即开始的任务，进行中任务的估算总和不超过预算；
+                # 单个任务超过预算时在没有其他任务进行时单独转换
+                while pending and not self._cancel_event.is_set():
+                    image_path, output_path, estimate = pending[-1]
+                    if memory_budget and running and (len(running) >= max_workers or in_use + estimate > memory_budget):
+                        break
+                    pending.pop()
+                    future = executor.submit(_convert_task_in_worker, image_path, output_path, output_format, quality, bit_depth, resize)
+                    running[future] = (image_path, output_path, estimate)
+                    in_use += estimate
+                if self._cancel_event.is_set():
+                    # 尚未开始的任务不再交给工作进程
+                    while pending:
+                        yield self._make_record(*pending.pop()[:2], 'cancelled')
+                    for future in running:
+                        future.cancel()
+                
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    image_path, output_path, estimate = running.pop(future)
+                    in_use -= estimate
+                    if future.cancelled():
+                        yield self._make_record(image_path, output_path, 'cancelled')
+                        continue
+                    try:
+                        yield future.result()
+                    except Exception as e:
+                        yield self._make_record(image_path, output_path, 'failed', str(e))
+    
+    def _run_tasks_with_cache(self, tasks, result_cache, output_format, quality, bit_depth, workers, resize=None, memory_budget=None):
+        """
+        通过结果缓存执行转换任务：命中缓存的文件直接生成输出，
+        同一批次中内容相同的输入只转换第一个，其余在它完成后从缓存生成
+        
+        Args:
+            tasks: (输入路径, 输出路径) 列表
+            result_cache: 转换结果缓存
+            其余参数同_run_tasks
+            
+        Yields:
+            dict: 结果记录
+        """
+        params = JobJournal.make_params(output_format, quality, bit_depth, resize)
+        hashes = result_cache.source_hashes([image_path for image_path, _ in tasks], max(workers, 1))
+        keys = {}  # 需要转换的输入路径 -> 缓存键
+        duplicates = {}  # 缓存键 -> 等待同内容任务完成的 (输入路径, 输出路径) 列表
+        pending = []
+        for image_path, output_path in tasks:
+            if hashes.get(image_path) is None:
+                pending.append((image_path, output_path))
+                continue
+            key = result_cache.make_key(hashes[image_path], params, Path(output_path).suffix)
+            if key in duplicates:
+                duplicates[key].append((image_path, output_path))
+                continue
+            record = self._emit_from_cache(result_cache, key, image_path, output_path)
+            if record:
+                yield record
+                continue
+            keys[image_path] = key
+            duplicates[key] = []
+            pending.append((image_path, output_path))
+        
+        for record in self._run_tasks(pending, output_format, quality, bit_depth, workers, resize, memory_budget):
+            key = keys.get(record['input'])
+            if key is not None and record['status'] == 'success':
+                try:
+                    result_cache.put(key, record['output'])
+                except OSError as e:
+                    print(f"写入结果缓存失败 {record['output']}: {e}")
+            yield record
+            for image_path, output_path in duplicates.pop(key, []):
+                if record['status'] == 'success':
+                    # 缓存容量不足未能保存时，直接从刚生成的输出复制
+                    yield (self._emit_from_cache(result_cache, key, image_path, output_path, record['output'])
+                           or self._make_record(image_path, output_path, 'failed', '复制相同内容的转换结果失败'))
+                else:
+                    yield self._make_record(image_path, output_path, record['status'], record['error'])
+    
+    def _emit_from_cache(self, result_cache, key, image_path, output_path, fallback_path=None):
+        """
+        从结果缓存生成输出文件
+        
+        Args:
+            fallback_path: 未命中时用于复制的同内容输出文件
+            
+        Returns:
+            dict or None: 结果记录，未命中时返回None
+        """
+        timer = StageTimer()
+        start = time.perf_counter()
+        with timer.stage('cache'):
+            try:
+                hit = result_cache.get(key, output_path)
+                if not hit and fallback_path:
+                    copy_or_link(fallback_path, output_path)
+                    hit = True
+            except OSError as e:
+                print(f"从结果缓存生成输出失败 {output_path}: {e}")
+                hit = False
+        if not hit:
+            return None
+        timer.bytes_written += os.path.getsize(output_path)
+        return self._make_record(image_path, output_path, 'success', seconds=time.perf_counter() - start, timer=timer)
+    
+    def _make_record(self, image_path, output_path, status, error=None, seconds=0.0, timer=None):
+        """创建单个文件的结果记录，包含各阶段耗时、读写字节数和执行转换的进程的峰值内存"""
+        peak_rss = peak_rss_bytes() if timer else 0
+        timer = timer or StageTimer()
+        return {
+            'input': image_path,
+            'output': output_path,
+            'status': status,
+            'error': error,
+            'seconds': seconds,
+            'stages': timer.stages,
+            'bytes_read': timer.bytes_read,
+            'bytes_written': timer.bytes_written,
+            'peak_rss': peak_rss,
+        }
+    
+    def _convert_task(self, image_path, output_path, output_format, quality, bit_depth, resize=None):
+        """
+        转换单个文件并计时
+        
+        Returns:
+            dict: 结果记录
+        """
+        timer = StageTimer(self._cancel_event)
+        start = time.perf_counter()
+        try:
+            success, message = self._convert_file(image_path, output_path, output_format, quality, bit_depth, resize, timer)
+        except ConversionCancelled:
+            return self._make_record(image_path, output_path, 'cancelled', seconds=time.perf_counter() - start, timer=timer)
+        seconds = time.perf_counter() - start
+        if success:
+            return self._make_record(image_path, output_path, 'success', seconds=seconds, timer=timer)
+        return self._make_record(image_path, output_path, 'failed', message, seconds, timer)
+    
+    def _convert_file(self, image_path, output_path, output_format, quality, bit_depth, resize=None, timer=None):
+        """
+        转换单个文件
+        
+        Args:
+            timer: 分阶段计时器，为None时不记录
+        
+        Returns:
+            tuple: (是否成功, 错误信息)
+        """
+        timer = timer or StageTimer()
+        try:
+            # 检查是否需要完全保持原样（原格式、原位深、quality=100、不缩放）
+            is_keep_original = (output_format is None and bit_depth is None and quality == 100 and not resize)
+            
+            if is_keep_original:
+                # 完全保持原样，直接复制文件
+                self._copy_file(image_path, output_path, timer)
+                return True, None
+            
+            # 检查位深兼容性
+            with timer.stage('probe'):
+                is_compatible, actual_bit_depth = self._check_bit_depth_compatibility(image_path, bit_depth)
+            
+            # 如果位深不兼容，记录日志而不显示对话框
+            if not is_compatible and bit_depth is not None:
+                original_bit_depth = self._get_image_bit_depth(image_path)
+                message = f"{os.path.basename(image_path)}: {original_bit_depth}位→{bit_depth}位（自动调整为8位）"
+                
+                # 只在控制台输出，避免线程安全问题
+                print(f"[位深调整] {message}")
+            
+            # 执行转换
+            # 如果output_format为None，表示保持原格式，不进行格式转换
+            if output_format is None:
+                if not resize:
+                    # 直接复制文件，保持原格式
+                    self._copy_file(image_path, output_path, timer)
+                    return True, None
+                if Path(image_path).suffix.lower() in RAW_EXTENSIONS:
+                    return False, "RAW文件无法按原格式缩放"
+
+                # 需要缩放时按原格式重新编码
+                output_format = Path(output_path).suffix[1:].upper()
+                output_format = {'JPG': 'JPEG', 'TIF': 'TIFF'}.get(output_format, output_format)
+            return self.converter.convert(image_path, output_path, output_format, quality, actual_bit_depth, resize, timer)
+        except ConversionCancelled:
+            raise
+        except Exception as e:
+            return False, str(e)
+    
+    def _copy_file(self, image_path, output_path, timer):
+        """复制文件并记录耗时和字节数"""
+        with timer.stage('copy'):
+            fast_copy(image_path, output_path)
+        size = os.path.getsize(output_path)
+        timer.bytes_read += size
+        timer.bytes_written += size
+    
     def get_supported_formats(self):
         """
         获取支持的图片格式
@@ -190,60 +545,81 @@ class ConversionService:
         supported_input_formats = pillow_formats + raw_formats
         return supported_input_formats
     
-    def _find_conflict_files(self, directory, filename_stem):
+    def _get_conflict_extensions(self):
+        """
+        获取冲突检测时视为图片的扩展名集合（小写和大写两种形式）
+        替换模式会删除这些冲突文件，不要随意扩大该集合
+        
+        Returns:
+            set: 扩展名集合
+        """
+        all_extensions = set()
+        # 支持的输出和输入格式，另加JPEG常用的.jpg
+        for fmt in self.get_supported_formats() + self.get_supported_input_formats() + ['JPG']:
+            all_extensions.add(f'.{fmt.lower()}')
+            all_extensions.add(f'.{fmt.upper()}')
+        return all_extensions
+    
+    def build_output_index(self, output_dir):
+        """
+        单次扫描输出目录，建立 文件名主体 -> 文件路径列表 的索引
+        
+        Args:
+            output_dir: 输出目录
+            
+        Returns:
+            dict: 输出目录索引
+        """
+        output_index = {}
+        try:
+            with os.scandir(output_dir) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        stem = os.path.splitext(entry.name)[0]
+                        output_index.setdefault(os.path.normcase(stem), []).append(entry.path)
+        except FileNotFoundError:
+            pass
+        return output_index
+    
+    def _index_contains(self, output_index, output_path):
+        """检查输出目录索引中是否存在指定文件"""
+        stem = os.path.splitext(os.path.basename(output_path))[0]
+        target = os.path.normcase(output_path)
+        return any(os.path.normcase(p) == target for p in output_index.get(os.path.normcase(stem), []))
+    
+    def _delete_conflict_files(self, conflict_files, output_index):
+        """删除冲突文件并同步更新输出目录索引"""
+        for conflict_file in conflict_files:
+            try:
+                os.remove(conflict_file)
+            except Exception as e:
+                print(f"删除冲突文件失败 {conflict_file}: {e}")
+                continue
+            paths = output_index.get(os.path.normcase(Path(conflict_file).stem), [])
+            if conflict_file in paths:
+                paths.remove(conflict_file)
+    
+    def _find_conflict_files(self, directory, filename_stem, output_index=None):
         """
         查找与指定文件名主体冲突的文件（忽略后缀名）
         
         Args:
             directory: 搜索目录
             filename_stem: 文件名主体（不含后缀）
+            output_index: 输出目录索引，为None时重新扫描目录
             
         Returns:
             list: 冲突文件路径列表
         """
-        conflict_files = []
+        if output_index is None:
+            output_index = self.build_output_index(directory)
         
-        # 获取支持的所有图片扩展名
-        supported_formats = self.get_supported_formats()
-        # 添加常见的小写形式
-        all_extensions = set()
-        for fmt in supported_formats:
-            all_extensions.add(f'.{fmt.lower()}')
-            all_extensions.add(f'.{fmt.upper()}')
-        
-        # 获取支持的输入格式并添加扩展名
-        input_formats = self.get_supported_input_formats()
-        for fmt in input_formats:
-            all_extensions.add(f'.{fmt.lower()}')
-            all_extensions.add(f'.{fmt.upper()}')
-        
-        # 添加一些额外的常见格式
-        extra_extensions = {'.jpg', '.jpeg', '.JPG', '.JPEG', '.png', '.PNG', 
-                           '.bmp', '.BMP', '.gif', '.GIF', '.tiff', '.TIFF', 
-                           '.webp', '.WEBP', '.heic', '.HEIC', '.heif', '.HEIF',
-                           '.avif', '.AVIF', '.ico', '.ICO', '.ppm', '.PPM',
-                           '.pgm', '.PGM', '.pbm', '.PBM', '.dds', '.DDS',
-                           '.pcx', '.PCX', '.tga', '.TGA', '.sgi', '.SGI',
-                           '.xbm', '.XBM', '.xpm', '.XPM', '.cr2', '.CR2',
-                           '.cr3', '.CR3', '.crw', '.CRW', '.nef', '.NEF',
-                           '.nrw', '.NRW', '.arw', '.ARW', '.sr2', '.SR2',
-                           '.srf', '.SRF', '.dng', '.DNG', '.orf', '.ORF',
-                           '.rw2', '.RW2', '.pef', '.PEF', '.raf', '.RAF',
-                           '.srw', '.SRW', '.3fr', '.3FR', '.fff', '.FFF',
-                           '.kdc', '.KDC', '.mrw', '.MRW', '.mos', '.MOS',
-                           '.rwl', '.RWL', '.x3f', '.X3F'}
-        all_extensions.update(extra_extensions)
-        
-        # 检查每个可能的扩展名
-        for ext in all_extensions:
-            test_filename = f"{filename_stem}{ext}"
-            test_path = os.path.join(directory, test_filename)
-            if os.path.exists(test_path):
-                conflict_files.append(test_path)
-        
-        return conflict_files
+        return [
+            path for path in output_index.get(os.path.normcase(filename_stem), [])
+            if os.path.normcase(os.path.splitext(path)[1]) in self.conflict_extensions
+        ]
     
-    def _scan_for_conflicts(self, image_files, output_dir, output_format, replace):
+    def _scan_for_conflicts(self, image_files, output_dir, output_format, replace, progress_callback=None, output_index=None):
         """
         预扫描所有文件的冲突情况
         
@@ -252,38 +628,29 @@ class ConversionService:
             output_dir: 输出目录
             output_format: 输出格式
             replace: 是否替换同名文件
+            progress_callback: 进度回调函数 (当前数量, 总数量)
+            output_index: 输出目录索引，为None时重新扫描目录
             
         Returns:
             dict: 冲突信息字典
         """
         conflict_info = {}
+        if output_index is None:
+            output_index = self.build_output_index(output_dir)
         
-        for image_path in image_files:
+        total = len(image_files)
+        for i, image_path in enumerate(image_files):
             filename = Path(image_path).stem
-            
-            # 如果output_format为None，表示保持原格式
-            if output_format is None:
-                # 获取原文件的扩展名
-                original_ext = Path(image_path).suffix.lower()
-                # 处理JPEG格式的特殊情况
-                if original_ext in ['.jpg', '.jpeg']:
-                    output_filename = f"{filename}.jpg"
-                else:
-                    output_filename = f"{filename}{original_ext}"
-            else:
-                if output_format.upper() == 'JPEG':
-                    output_filename = f"{filename}.jpg"
-                else:
-                    output_filename = f"{filename}.{output_format.lower()}"
-            output_path = os.path.join(output_dir, output_filename)
+            output_path = self.get_output_path(image_path, output_dir, output_format)
+            output_filename = os.path.basename(output_path)
             
             conflicts = []
             if replace:
                 # 忽略后缀名检查同名文件
-                conflicts = self._find_conflict_files(output_dir, filename)
+                conflicts = self._find_conflict_files(output_dir, filename, output_index)
             else:
                 # 精确匹配检查
-                if os.path.exists(output_path):
+                if self._index_contains(output_index, output_path):
                     conflicts = [output_path]
             
             if conflicts:
@@ -291,6 +658,10 @@ class ConversionService:
                     'output_filename': output_filename,
                     'conflict_files': conflicts
                 }
+            
+            # 每100个文件报告一次进度
+            if progress_callback and ((i + 1) % 100 == 0 or i + 1 == total):
+                progress_callback(i + 1, total)
         
         return conflict_info
     
@@ -402,41 +773,8 @@ class ConversionService:
             int: 图像的原始位深（8, 10, 12, 16等）
         """
         try:
-            # 判断是否为RAW文件
-            raw_extensions = {
-                '.cr2', '.cr3', '.nef', '.nrw', '.arw', '.srf', '.sr2',
-                '.dng', '.orf', '.rw2', '.rwl', '.pef', '.ptx',
-                '.3fr', '.fff', '.mef', '.mos', '.erf', '.dcr', '.kdc',
-                '.raw', '.raf', '.x3f', '.iiq'
-            }
-            ext = os.path.splitext(image_path)[1].lower()
-            is_raw = ext in raw_extensions
-            
-            if is_raw:
-                # RAW文件通常为16位
-                return 16
-            else:
-                # 使用OpenCV读取图像
-                img = cv.imread(image_path)
-                if img is None:
-                    # 如果OpenCV无法读取，尝试使用Pillow
-                    with Image.open(image_path) as pil_img:
-                        if pil_img.mode in ('I;16', 'I;16B', 'I;16L', 'I;16N'):
-                            return 16
-                        elif pil_img.mode in ('I;12', 'I;12B', 'I;12L'):
-                            return 12
-                        elif pil_img.mode in ('I;10', 'I;10B', 'I;10L'):
-                            return 10
-                        else:
-                            return 8
-                else:
-                    # 检查OpenCV图像的数据类型
-                    if img.dtype == 'uint16':
-                        return 16
-                    elif img.dtype == 'uint8':
-                        return 8
-                    else:
-                        return 8  # 默认返回8位
+            # 只读取文件头部，结果按路径和修改时间缓存
+            return probe_image(image_path).bit_depth
         except Exception as e:
             print(f"获取图像位深失败 {image_path}: {str(e)}")
             return 8  # 出错时默认返回8位
@@ -0,0 +1,52 @@
+"""
+目录扫描服务
+在后台线程中单次遍历目录树，分批发送发现的图片文件
+"""
+import time
+from PySide6.QtCore import QThread, Signal
+
+from core.utils import iter_image_files
+
+
+class DirectoryScanThread(QThread):
+    """目录扫描线程"""
+    files_found = Signal(list)  # 一批新发现的文件路径
+    finished_scanning = Signal(int, bool)  # 文件总数, 是否被取消
+    
+    def __init__(self, directory, batch_size=500, batch_interval=0.1):
+        """
+        Args:
+            directory: 根目录
+            batch_size: 每批最多文件数
+            batch_interval: 两批之间的最长间隔（秒）
+        """
+        super().__init__()
+        self.directory = directory
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self._is_cancelled = False
+    
+    def run(self):
+        """遍历目录并分批发送结果"""
+        total = 0
+        batch = []
+        last_emit = time.monotonic()
+        
+        for file_path in iter_image_files(self.directory, is_cancelled=lambda: self._is_cancelled):
+            batch.append(file_path)
+            now = time.monotonic()
+            if len(batch) >= self.batch_size or now - last_emit >= self.batch_interval:
+                total += len(batch)
+                self.files_found.emit(batch)
+                batch = []
+                last_emit = now
+        
+        if batch and not self._is_cancelled:
+            total += len(batch)
+            self.files_found.emit(batch)
+        
+        self.finished_scanning.emit(total, self._is_cancelled)
+    
+    def cancel(self):
+        """取消扫描"""
+        self._is_cancelled = True
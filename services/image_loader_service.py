@@ -3,43 +3,91 @@
 负责异步加载图片文件
 """
 import os
+import time
+from collections import Counter
 from PySide6.QtCore import QThread, Signal
 
+# 同一目录中请求的文件达到该数量时才整体扫描目录，否则逐个检查，不为几个文件列出NAS上的大目录
+BULK_LIST_MIN_FILES = 16
+
 
 class ImageLoaderThread(QThread):
     """图片加载线程"""
     progress_updated = Signal(int, int)  # 当前进度, 总数量
-    file_loaded = Signal(str)  # 文件路径
+    files_loaded = Signal(list)  # 一批已加载的文件路径
     finished_loading = Signal(list)  # 所有加载的文件路径
     
-    def __init__(self, files):
+    def __init__(self, files, emit_interval=0.05):
+        """
+        Args:
+            files: 文件路径列表
+            emit_interval: 两次发送信号之间的最短间隔（秒）
+        """
         super().__init__()
         self.files = files
+        self.emit_interval = emit_interval
         self._is_cancelled = False
     
     def run(self):
         """在后台线程中运行图片加载"""
         total_files = len(self.files)
         loaded_files = []
+        batch = []
+        dir_entries = {}  # 目录 -> 目录中的文件名集合
+        dir_counts = Counter(os.path.dirname(file_path) for file_path in self.files)
+        last_emit = time.monotonic()
         
         for i, file_path in enumerate(self.files):
             if self._is_cancelled:
                 break
                 
             # 检查文件是否存在
-            if os.path.exists(file_path):
-                loaded_files.append(file_path)
-                self.file_loaded.emit(file_path)
+            if self._file_exists(file_path, dir_entries, dir_counts):
+                batch.append(file_path)
             
-            # 更新进度
-            self.progress_updated.emit(i + 1, total_files)
-            
-            # 短暂延迟，避免线程占用过高CPU
-            self.msleep(10)
+            # 按时间间隔批量发送，发送频率与文件数量无关，GUI线程不会被信号淹没
+            now = time.monotonic()
+            if now - last_emit >= self.emit_interval:
+                self._emit_batch(batch, loaded_files, i + 1, total_files)
+                batch = []
+                last_emit = now
         
         if not self._is_cancelled:
+            self._emit_batch(batch, loaded_files, total_files, total_files)
             self.finished_loading.emit(loaded_files)
     
+    def _emit_batch(self, batch, loaded_files, current, total):
+        """发送一批结果和当前进度"""
+        if batch:
+            loaded_files.extend(batch)
+            self.files_loaded.emit(batch)
+        self.progress_updated.emit(current, total)
+    
+    def _file_exists(self, file_path, dir_entries, dir_counts):
+        """
+        判断文件是否存在：请求的文件较多的目录只扫描一次，之后在内存中判断，其余目录逐个检查
+        
+        Args:
+            file_path: 文件路径
+            dir_entries: 已扫描的目录 -> 目录中的文件名集合
+            dir_counts: 目录 -> 请求的文件数
+        """
+        directory, name = os.path.split(file_path)
+        if dir_counts[directory] < BULK_LIST_MIN_FILES:
+            return os.path.exists(file_path)
+        if directory not in dir_entries:
+            try:
+                with os.scandir(directory or '.') as it:
+                    dir_entries[directory] = {os.path.normcase(e.name) for e in it if e.is_file()}
+            except OSError:
+                dir_entries[directory] = None
+        
+        names = dir_entries[directory]
+        if names is None:
+            # 目录无法扫描时逐个检查
+            return os.path.exists(file_path)
+        return os.path.normcase(name) in names
+    
     def cancel(self):
         """取消加载"""
         self._is_cancelled = True
@@ -53,7 +101,7 @@ class ImageLoaderService:
         self.loader_thread = None
         self.is_loading = False
     
-    def start_loading(self, files, progress_callback=None, finished_callback=None):
+    def start_loading(self, files, progress_callback=None, finished_callback=None, batch_callback=None):
         """
         启动图片加载
         
@@ -61,6 +109,7 @@ class ImageLoaderService:
             files: 文件路径列表
             progress_callback: 进度回调函数
             finished_callback: 完成回调函数
+            batch_callback: 批量结果回调函数，参数为一批已加载的文件路径
         """
         if self.is_loading:
             return False
@@ -77,9 +126,19 @@ class ImageLoaderService:
         if finished_callback:
             self.loader_thread.finished_loading.connect(finished_callback)
         
+        if batch_callback:
+            self.loader_thread.files_loaded.connect(batch_callback)
+        
+        # 线程结束后允许再次加载
+        self.loader_thread.finished.connect(self._on_thread_finished)
+        
         self.loader_thread.start()
         return True
     
+    def _on_thread_finished(self):
+        """加载线程结束"""
+        self.is_loading = False
+    
     def cancel_loading(self):
         """取消图片加载"""
         if self.loader_thread and self.loader_thread.isRunning():
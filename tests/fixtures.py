@@ -0,0 +1,43 @@
+"""
+测试用图片生成
+"""
+import os
+import unittest
+
+import numpy as np
+
+
+def write_dng(path, width=400, height=300):
+    """
+    写入合成的12位RGGB拜耳阵列DNG文件，需要pidng（不是项目依赖），未安装时跳过测试
+
+    Args:
+        path: DNG文件路径
+        width: 宽度（偶数）
+        height: 高度（偶数）
+
+    Raises:
+        unittest.SkipTest: 未安装pidng
+    """
+    try:
+        from pidng.core import RAW2DNG, DNGTags, Tag
+        from pidng.defs import PhotometricInterpretation
+    except ImportError:
+        raise unittest.SkipTest('需要pidng生成DNG测试文件')
+    # 平滑渐变，去马赛克后各通道都有变化
+    y, x = np.mgrid[0:height, 0:width]
+    bayer = ((x + y) * 4095 // (width + height)).astype(np.uint16)
+    tags = DNGTags()
+    tags.set(Tag.ImageWidth, width)
+    tags.set(Tag.ImageLength, height)
+    tags.set(Tag.BitsPerSample, 12)
+    tags.set(Tag.SamplesPerPixel, 1)
+    tags.set(Tag.PhotometricInterpretation, PhotometricInterpretation.Color_Filter_Array)
+    tags.set(Tag.CFARepeatPatternDim, [2, 2])
+    tags.set(Tag.CFAPattern, [0, 1, 1, 2])
+    tags.set(Tag.WhiteLevel, 4095)
+    tags.set(Tag.Make, 'Synthetic')
+    tags.set(Tag.Model, 'Test')
+    converter = RAW2DNG()
+    converter.options(tags, path=os.path.dirname(path), compress=False)
+    converter.convert(bayer, filename=os.path.splitext(os.path.basename(path))[0])
@@ -0,0 +1,60 @@
+"""
+转换服务测试
+"""
+import os
+import tempfile
+import unittest
+
+from PIL import Image
+
+from core.image_probe import ensure_heif_opener
+from services.conversion_service import ConversionService
+
+
+class KeepFormatResizeTest(unittest.TestCase):
+    """保持原格式并缩放测试"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.input_dir = os.path.join(self.temp_dir.name, 'in')
+        self.output_dir = os.path.join(self.temp_dir.name, 'out')
+        os.makedirs(self.input_dir)
+        os.makedirs(self.output_dir)
+        ensure_heif_opener()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _convert(self, paths):
+        """按原格式、原格式默认质量100缩小一半，返回结果记录"""
+        records = []
+        ConversionService().convert_images(
+            paths, self.output_dir, None, quality=100, resize=('scale', 0.5),
+            result_callback=records.append, journal=False
+        )
+        return records
+
+    def test_webp_and_avif_are_reencoded_at_quality_100(self):
+        paths = []
+        for ext in ('webp', 'avif'):
+            path = os.path.join(self.input_dir, f"photo_{ext}.{ext}")
+            Image.new('RGB', (64, 48), (200, 80, 40)).save(path)
+            paths.append(path)
+        records = self._convert(paths)
+        self.assertEqual([r['status'] for r in records], ['success', 'success'], [r['error'] for r in records])
+        for record in records:
+            with Image.open(record['output']) as img:
+                self.assertEqual(img.size, (32, 24))
+
+    def test_raw_is_skipped(self):
+        # 保持原格式且缩放时RAW在读取文件内容之前就被跳过
+        path = os.path.join(self.input_dir, 'photo.dng')
+        with open(path, 'wb') as f:
+            f.write(b'\0' * 16)
+        records = self._convert([path])
+        self.assertEqual(records[0]['status'], 'skipped')
+        self.assertFalse(os.path.exists(records[0]['output']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+"""
+图像转换测试
+"""
+import os
+import tempfile
+import unittest
+
+from PIL import Image
+
+from core.image_converter import ImageConverter
+from core.stage_timer import StageTimer
+from tests.fixtures import write_dng
+
+
+class RawBitDepthTest(unittest.TestCase):
+    """RAW输出位深测试"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(cls.temp_dir.cleanup)
+        cls.raw_path = os.path.join(cls.temp_dir.name, 'photo.dng')
+        write_dng(cls.raw_path)
+
+    def _convert(self, format_name, ext, bit_depth):
+        """转换测试RAW文件，返回结果、输出路径和计时器"""
+        output_path = os.path.join(self.temp_dir.name, f"out_{bit_depth}.{ext}")
+        timer = StageTimer()
+        result = ImageConverter().convert(self.raw_path, output_path, format_name, 85, bit_depth, None, timer)
+        return result, output_path, timer
+
+    def test_unspecified_depth_keeps_16_bit_for_tiff(self):
+        result, output_path, _ = self._convert('TIFF', 'tiff', None)
+        self.assertEqual(result, (True, "转换成功"))
+        import cv2 as cv
+        self.assertEqual(cv.imread(output_path, cv.IMREAD_UNCHANGED).dtype.name, 'uint16')
+
+    def test_unspecified_depth_is_8_bit_for_jpeg(self):
+        result, output_path, _ = self._convert('JPEG', 'jpg', None)
+        self.assertEqual(result, (True, "转换成功"))
+        with Image.open(output_path) as img:
+            self.assertEqual(img.format, 'JPEG')
+
+    def test_high_depth_jpeg_is_capped_to_8_bit(self):
+        result, output_path, timer = self._convert('JPEG', 'jpeg', 16)
+        self.assertEqual(result, (True, "转换成功"))
+        self.assertGreater(timer.bytes_written, 0)
+        with Image.open(output_path) as img:
+            self.assertEqual(img.mode, 'RGB')
+
+
+if __name__ == '__main__':
+    unittest.main()
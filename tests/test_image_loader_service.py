@@ -0,0 +1,47 @@
+"""
+图片加载服务测试
+"""
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from services.image_loader_service import ImageLoaderThread, BULK_LIST_MIN_FILES
+
+
+class FileExistsTest(unittest.TestCase):
+    """文件存在性检查测试"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        # 目录中还有大量未请求的文件
+        for i in range(100):
+            open(os.path.join(self.temp_dir.name, f"IMG_{i:04d}.jpg"), 'w').close()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _load(self, names):
+        """在当前线程中运行加载，返回存在的文件和目录扫描次数"""
+        files = [os.path.join(self.temp_dir.name, name) for name in names]
+        thread = ImageLoaderThread(files)
+        loaded = []
+        thread.finished_loading.connect(loaded.extend)
+        with mock.patch('os.scandir', wraps=os.scandir) as scandir:
+            thread.run()
+        return [os.path.basename(path) for path in loaded], scandir.call_count
+
+    def test_few_files_are_checked_individually(self):
+        loaded, scans = self._load(['IMG_0001.jpg', 'missing.jpg'])
+        self.assertEqual(loaded, ['IMG_0001.jpg'])
+        self.assertEqual(scans, 0)
+
+    def test_many_files_list_directory_once(self):
+        names = [f"IMG_{i:04d}.jpg" for i in range(BULK_LIST_MIN_FILES)] + ['missing.jpg']
+        loaded, scans = self._load(names)
+        self.assertEqual(loaded, names[:-1])
+        self.assertEqual(scans, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
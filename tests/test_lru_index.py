@@ -0,0 +1,60 @@
+"""
+SQLite LRU索引测试
+"""
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from core.lru_index import LruIndex
+
+
+class LruIndexEvictionTest(unittest.TestCase):
+    """LRU淘汰测试"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, 'index.db')
+        self.conn = sqlite3.connect(self.db_path, isolation_level=None)
+        self.index = LruIndex(self.conn, 'entries', max_bytes=10_000)
+
+    def tearDown(self):
+        self.conn.close()
+        self.temp_dir.cleanup()
+
+    def _keys(self):
+        return {row[0] for row in self.conn.execute('SELECT key FROM entries')}
+
+    def test_overflow_evicts_only_oldest(self):
+        """超出上限时只淘汰最旧的条目，降到上限的90%即停止"""
+        evicted = [self.index.put(f"k{i}", 3000) for i in range(4)]
+        self.assertEqual(evicted, [[], [], [], ['k0']])
+        self.assertEqual(self.index.total_bytes, 9000)
+        self.assertEqual(self._keys(), {'k1', 'k2', 'k3'})
+
+    def test_recently_touched_survives(self):
+        """最近访问的条目不会被优先淘汰"""
+        for i in range(3):
+            self.index.put(f"k{i}", 3000)
+        self.index.touch('k0')
+        self.assertEqual(self.index.put('k3', 3000), ['k1'])
+
+    def test_new_entry_is_never_evicted(self):
+        """刚写入的条目不会被自身触发的淘汰删除"""
+        self.index.put('small', 2000)
+        self.assertEqual(self.index.put('big', 9500), ['small'])
+        self.assertEqual(self._keys(), {'big'})
+
+    def test_order_survives_reopen(self):
+        """重新打开后访问序号继续递增"""
+        self.index.put('k0', 3000)
+        self.index.put('k1', 3000)
+        self.index = LruIndex(self.conn, 'entries', max_bytes=10_000)
+        self.assertEqual(self.index.total_bytes, 6000)
+        self.index.touch('k0')
+        self.index.put('k2', 3000)
+        self.assertEqual(self.index.put('k3', 3000), ['k1'])
+
+
+if __name__ == '__main__':
+    unittest.main()
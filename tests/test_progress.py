@@ -0,0 +1,37 @@
+"""
+转换进度汇总测试
+"""
+import threading
+import unittest
+
+from core.progress import ProgressAggregator
+
+
+class ProgressCallbackTest(unittest.TestCase):
+    """进度回调测试"""
+
+    def _run(self, target):
+        """在线程中运行，超时视为死锁"""
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+        thread.join(5)
+        self.assertFalse(thread.is_alive(), '进度回调死锁')
+
+    def test_callback_can_reenter(self):
+        snapshots = []
+
+        def callback(snapshot):
+            # 回调中读取进度，并在首次回调时补记一个文件（如取消时记录剩余文件）
+            snapshots.append(aggregator.snapshot())
+            if len(snapshots) == 1:
+                aggregator.update({'input': 'b.jpg', 'status': 'cancelled'})
+
+        aggregator = ProgressAggregator(2, callback)
+        self._run(lambda: aggregator.update({'input': 'a.jpg', 'status': 'success'}))
+        aggregator.close()
+        self.assertEqual(snapshots[-1].done, 2)
+        self.assertEqual(snapshots[-1].eta, 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
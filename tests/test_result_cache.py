@@ -0,0 +1,72 @@
+"""
+转换结果缓存测试
+"""
+import os
+import tempfile
+import unittest
+
+from core.result_cache import ResultCache
+
+
+class ResultCacheEvictionTest(unittest.TestCase):
+    """淘汰时删除缓存对象测试（淘汰顺序见test_lru_index）"""
+
+    def test_evicted_objects_are_removed(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache = ResultCache(os.path.join(temp_dir, 'cache'), max_bytes=10_000)
+            for i in range(4):
+                path = os.path.join(temp_dir, f"k{i}.out")
+                with open(path, 'wb') as f:
+                    f.write(os.urandom(3000))
+                cache.put(f"k{i}", path)
+            cache.close()
+            objects = {name for _, _, names in os.walk(os.path.join(temp_dir, 'cache', 'objects')) for name in names}
+            self.assertEqual(objects, {'k1', 'k2', 'k3'})
+
+
+class ResultCacheIsolationTest(unittest.TestCase):
+    """缓存对象与输出文件互不影响测试"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.temp_dir.name, 'first.out')
+        with open(self.output, 'wb') as f:
+            f.write(b'converted')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _emit(self, cache, name):
+        """从缓存生成输出文件"""
+        path = os.path.join(self.temp_dir.name, name)
+        self.assertTrue(cache.get('key', path))
+        return path
+
+    def test_outputs_are_independent_copies(self):
+        cache = ResultCache(os.path.join(self.temp_dir.name, 'cache'))
+        self.addCleanup(cache.close)
+        cache.put('key', self.output)
+        second = self._emit(cache, 'second.out')
+        self.assertEqual(os.stat(self.output).st_nlink, 1)
+        self.assertEqual(os.stat(second).st_nlink, 1)
+        # 原地修改输出不影响缓存和其他输出
+        with open(self.output, 'r+b') as f:
+            f.write(b'EDITED---')
+        third = self._emit(cache, 'third.out')
+        for path in (second, third):
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(), b'converted')
+
+    def test_hardlink_is_opt_in_and_read_only(self):
+        cache = ResultCache(os.path.join(self.temp_dir.name, 'cache'), hardlink=True)
+        self.addCleanup(cache.close)
+        cache.put('key', self.output)
+        second = self._emit(cache, 'second.out')
+        # 保存时总是复制，只有生成输出时才硬链接，共享数据的输出为只读
+        self.assertEqual(os.stat(self.output).st_nlink, 1)
+        self.assertEqual(os.stat(second).st_nlink, 2)
+        self.assertFalse(os.stat(second).st_mode & 0o222)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+"""
+持久化缩略图存储测试
+"""
+import os
+import tempfile
+import unittest
+
+from core.thumbnail_store import ThumbnailStore
+
+
+class ThumbnailStoreTest(unittest.TestCase):
+    """读写测试（淘汰顺序见test_lru_index）"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, 'thumbnails.db')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_thumbnails_persist_across_reopen(self):
+        store = ThumbnailStore(self.db_path)
+        store.put('a', b'thumbnail')
+        store.close()
+        store = ThumbnailStore(self.db_path)
+        self.addCleanup(store.close)
+        self.assertEqual(store.get('a'), b'thumbnail')
+        self.assertEqual(store.get_total_bytes(), len(b'thumbnail'))
+        self.assertIsNone(store.get('b'))
+        store.clear()
+        self.assertIsNone(store.get('a'))
+        self.assertEqual(store.get_total_bytes(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,10 +2,11 @@
 缩略图网格视图组件
 """
 import os
-from PySide6.QtCore import Qt, QSize, QRect, QPoint
+from PySide6.QtCore import Qt, QSize, QRect, QPoint, QTimer, QAbstractListModel, QModelIndex
 from PySide6.QtWidgets import QListView, QAbstractItemView, QStyledItemDelegate, QStyle
 from PySide6.QtGui import QPainter, QFontMetrics, QPalette, QBrush, QPen
 
+from core.file_collection import FileCollection
 from managers.thumbnail_manager import ThumbnailManager
 
 
@@ -61,21 +62,14 @@ class ThumbnailDelegate(QStyledItemDelegate):
         # 绘制缩略图
         thumbnail = self.thumbnail_manager.get_thumbnail(file_path)
         if thumbnail:
-            # 缩放缩略图以适应指定大小
-            scaled_thumbnail = thumbnail.scaled(
-                self.thumbnail_size,
-                Qt.AspectRatioMode.KeepAspectRatio,
-                Qt.TransformationMode.SmoothTransformation
-            )
-            
-            # 居中显示缩略图
-            x_offset = (self.thumbnail_size.width() - scaled_thumbnail.width()) // 2
-            y_offset = (self.thumbnail_size.height() - scaled_thumbnail.height()) // 2
+            # 缓存中的缩略图已缩放到目标大小，这里只需居中绘制
+            x_offset = (self.thumbnail_size.width() - thumbnail.width()) // 2
+            y_offset = (self.thumbnail_size.height() - thumbnail.height()) // 2
             
             painter.drawPixmap(
                 thumbnail_rect.left() + x_offset,
                 thumbnail_rect.top() + y_offset,
-                scaled_thumbnail
+                thumbnail
             )
         else:
             # 绘制占位符
@@ -114,10 +108,81 @@ class ThumbnailDelegate(QStyledItemDelegate):
         painter.restore()
 
 
+class ThumbnailListModel(QAbstractListModel):
+    """缩略图列表模型"""
+    
+    def __init__(self, files=None, parent=None):
+        super().__init__(parent)
+        # 与管理器共享的文件集合，所有增删都经过模型以发出行变化信号
+        self.files = files if files is not None else FileCollection()
+    
+    @property
+    def file_paths(self):
+        """文件路径列表"""
+        return self.files.paths
+    
+    def rowCount(self, parent=QModelIndex()):
+        return len(self.files)
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.files):
+            return None
+        
+        file_path = self.files[index.row()]
+        
+        if role == Qt.DisplayRole:
+            # 显示文件名
+            return os.path.basename(file_path)
+        elif role == Qt.UserRole:
+            # 存储文件路径
+            return file_path
+        elif role == Qt.DecorationRole:
+            # 返回缩略图（异步加载）
+            return None
+        
+        return None
+    
+    def set_files(self, file_paths):
+        """整体替换文件列表"""
+        self.beginResetModel()
+        self.files.clear()
+        self.files.extend(file_paths)
+        self.endResetModel()
+    
+    def add_files(self, file_paths):
+        """
+        在末尾批量插入文件，已存在的文件会被忽略
+        
+        Returns:
+            list: 实际插入的文件路径列表
+        """
+        new_files = self.files.filter_new(file_paths)
+        if new_files:
+            first = len(self.files)
+            self.beginInsertRows(QModelIndex(), first, first + len(new_files) - 1)
+            self.files.extend(new_files)
+            self.endInsertRows()
+        return new_files
+    
+    def remove_files(self, file_paths):
+        """按连续区间批量删除文件，从后往前删除以保持行号有效"""
+        rows = [self.files.index_of(f) for f in file_paths if f in self.files]
+        for first, last in reversed(FileCollection.row_ranges(rows)):
+            self.beginRemoveRows(QModelIndex(), first, last)
+            self.files.remove_range(first, last)
+            self.endRemoveRows()
+    
+    def clear(self):
+        """清空文件列表"""
+        self.beginResetModel()
+        self.files.clear()
+        self.endResetModel()
+
+
 class ThumbnailGridView(QListView):
     """缩略图网格视图"""
     
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, files=None):
         super().__init__(parent)
         
         # 初始化缩略图管理器
@@ -135,6 +200,10 @@ class ThumbnailGridView(QListView):
         self.setViewportMargins(0, 0, 0, 0)
         self.setBatchSize(100)  # 增加批量处理大小
         
+        # 设置模型，后续增删只做增量更新
+        self.list_model = ThumbnailListModel(files, self)
+        self.setModel(self.list_model)
+        
         # 设置委托
         self.delegate = ThumbnailDelegate(self.thumbnail_manager, self)
         self.setItemDelegate(self.delegate)
@@ -143,50 +212,52 @@ class ThumbnailGridView(QListView):
         self.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
         self.setDragEnabled(True)
         
+        # 滚动或缩放后延迟计算可见项，用于缩略图加载优先级
+        self._visible_timer = QTimer(self)
+        self._visible_timer.setSingleShot(True)
+        self._visible_timer.setInterval(50)
+        self._visible_timer.timeout.connect(self._update_visible_files)
+        
         # 连接信号
         self.thumbnail_manager.thumbnail_loaded.connect(self._on_thumbnail_loaded)
+        self.verticalScrollBar().valueChanged.connect(self._visible_timer.start)
         self.destroyed.connect(self._cleanup)
     
+    def resizeEvent(self, event):
+        """视图大小变化时更新可见项"""
+        super().resizeEvent(event)
+        self._visible_timer.start()
+    
     def set_files(self, file_paths):
-        """设置文件列表"""
-        from PySide6.QtCore import QAbstractListModel, QModelIndex
+        """设置文件列表（整体替换，保留仍在列表中的文件的缩略图）"""
+        kept_files = set(file_paths)
+        removed_files = [f for f in self.list_model.file_paths if f not in kept_files]
+        self.list_model.set_files(file_paths)
+        for file_path in removed_files:
+            self.thumbnail_manager.remove_thumbnail(file_path)
+        self._visible_timer.start()
+    
+    def add_files(self, file_paths):
+        """
+        在列表末尾追加文件
         
-        class ThumbnailListModel(QAbstractListModel):
-            def __init__(self, file_paths):
-                super().__init__()
-                self.file_paths = file_paths
-            
-            def rowCount(self, parent=QModelIndex()):
-                return len(self.file_paths)
-            
-            def data(self, index, role=Qt.DisplayRole):
-                if not index.isValid() or index.row() >= len(self.file_paths):
-                    return None
-                
-                file_path = self.file_paths[index.row()]
-                
-                if role == Qt.DisplayRole:
-                    # 显示文件名
-                    return os.path.basename(file_path)
-                elif role == Qt.UserRole:
-                    # 存储文件路径
-                    return file_path
-                elif role == Qt.DecorationRole:
-                    # 返回缩略图（异步加载）
-                    return None
-                
-                return None
-        
-        # 创建自定义模型
-        model = ThumbnailListModel(file_paths)
-        self.setModel(model)
-        
-        # 清空之前的缩略图缓存
-        self.thumbnail_manager.clear_cache()
+        Returns:
+            list: 实际追加的文件路径列表
+        """
+        new_files = self.list_model.add_files(file_paths)
+        self._visible_timer.start()
+        return new_files
+    
+    def remove_files(self, file_paths):
+        """移除指定文件，只清理这些文件的缩略图"""
+        self.list_model.remove_files(file_paths)
+        for file_path in file_paths:
+            self.thumbnail_manager.remove_thumbnail(file_path)
+        self._visible_timer.start()
     
     def clear_files(self):
         """清空文件列表"""
-        self.setModel(None)
+        self.list_model.clear()
         self.thumbnail_manager.clear_cache()
     
     def get_selected_files(self):
@@ -203,15 +274,25 @@ class ThumbnailGridView(QListView):
     
     def _on_thumbnail_loaded(self, file_path):
         """缩略图加载完成，刷新视图"""
-        # 找到包含该文件路径的索引并刷新
-        model = self.model()
-        if model and hasattr(model, 'file_paths'):
-            try:
-                index = model.file_paths.index(file_path)
-                model_index = model.index(index, 0)
-                self.update(model_index)
-            except ValueError:
-                pass  # 文件路径不在模型中
+        # 通过索引找到该文件所在行并刷新
+        row = self.list_model.files.index_of(file_path)
+        if row is not None:
+            self.update(self.list_model.index(row, 0))
+    
+    def _update_visible_files(self):
+        """计算当前可见的文件，通知缩略图管理器调整加载优先级"""
+        # 按半个网格的步长采样视口，每个网格单元至少命中一次
+        rect = self.viewport().rect()
+        step_x = max(1, self.gridSize().width() // 2)
+        step_y = max(1, self.gridSize().height() // 2)
+        visible_files = set()
+        for y in range(step_y // 2, rect.height(), step_y):
+            for x in range(step_x // 2, rect.width(), step_x):
+                index = self.indexAt(QPoint(x, y))
+                if index.isValid():
+                    visible_files.add(index.data(Qt.UserRole))
+        
+        self.thumbnail_manager.set_visible_files(visible_files)
     
     def _cleanup(self):
         """清理资源"""